@@ -1,375 +1,2923 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-import pandas as pd
-import numpy as np
 import re
 import os
-import ctypes
-from dateutil.parser import parse as date_parse
-from dateutil.parser._parser import ParserError
+import sys
+import csv
+import time
+import json
+import math
+import queue
+import base64
+import shutil
+import signal
+import socket
+import hashlib
+import zipfile
+import ipaddress
+import importlib
+import argparse
+import datetime
+import threading
+import unicodedata
+import tempfile
+import tracemalloc
+import multiprocessing
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from urllib.parse import parse_qs, urlsplit
+
+
+class _LazyModule:
+    """
+    Reemplazo de `import pandas as pd` que importa el módulo recién en el
+    primer uso (pd.DataFrame, np.float64...) y a partir de ahí deja el
+    módulo real en su lugar. Importar este archivo no carga pandas ni
+    numpy: la ventana aparece antes y el modo batch/CLI solo los carga al
+    comparar.
+    """
+
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+
+    def _import(self):
+        # Nombre privado: un `load` público taparía np.load/pd.load del módulo real
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._import(), attr)
+
+
+pd = _LazyModule('pandas', 'pd')
+np = _LazyModule('numpy', 'np')
+
+# tkinter se importa recién al abrir la GUI: el modo batch (--batch) corre
+# en servidores Linux sin display ni tkinter instalado.
+tk = ttk = filedialog = messagebox = scrolledtext = None
+
+
+def _load_tkinter():
+    global tk, ttk, filedialog, messagebox, scrolledtext
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox, scrolledtext
+
+# Patrón de un título de cuenta: número con puntos + texto (ej: "1.2.3 Caja")
+TITLE_PATTERN = r'^\s*([\d\.]+)\s+(.*)'
+
+# Regla de fin de bloque: tantas filas seguidas sin título cierran el estado
+MAX_EMPTY_TITLE_ROWS = 4
+
+# Umbral por defecto de la coincidencia aproximada de títulos (similitud 0-1)
+FUZZY_DEFAULT_THRESHOLD = 0.85
+
+# Formatos de fecha más comunes en los encabezados de período (ruta rápida)
+_DMY_DATE_RE = re.compile(r'^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$')
+_ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?$')
+# Números "sueltos" (importes, años, códigos): no son encabezados de período
+_PLAIN_NUMBER_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+# Puntos repetidos en la numeración de una cuenta ('1..2' -> '1.2')
+_DOTS_RE = re.compile(r'\.{2,}')
+
+
+def _valid_period(year, month, day):
+    """(año, mes) si la fecha existe en el calendario, si no None."""
+    try:
+        datetime.date(year, month, day)
+    except ValueError:
+        return None
+    return (year, month)
+
+
+def _import_dependencies():
+    """Importa pandas y numpy si todavía son los reemplazos perezosos."""
+    for module in (pd, np):
+        if isinstance(module, _LazyModule):
+            module._import()
+
+
+def _preload_dependencies():
+    """Carga pandas y numpy en un hilo aparte (la GUI lo lanza con la ventana ya visible)."""
+    threading.Thread(target=_import_dependencies, name='preload', daemon=True).start()
+
+
+def _fuzzy_text(text):
+    """
+    Texto de un título normalizado para la coincidencia aproximada: en
+    minúsculas, sin acentos ni puntuación y con espacios simples
+    ("Caja y Bancos." -> "caja y bancos").
+    """
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[\W_]+', ' ', text).split())
+
+
+def _trigrams(text):
+    """Conjunto de trigramas de caracteres de `text` (con los bordes marcados por espacios)."""
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=65536)
+def _parse_period_text(text):
+    """
+    Devuelve (año, mes) de un texto de fecha, o None si no es una fecha.
+    Memoizado por texto: los encabezados se repiten entre hojas y archivos.
+    """
+    match = _DMY_DATE_RE.match(text)
+    if match:
+        day, month, year = (int(g) for g in match.groups())
+        period = _valid_period(year, month, day)
+        if period:
+            return period
+        # Fecha imposible como dd/mm (ej: 12/31/2024): que decida dateutil
+
+    match = _ISO_DATE_RE.match(text)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+        period = _valid_period(year, month, day)
+        if period:
+            return period
+
+    # Solo se llama a dateutil si el texto "parece" una fecha
+    if not any(c.isdigit() for c in text) or _PLAIN_NUMBER_RE.match(text):
+        return None
+    from dateutil.parser import parse as date_parse  # Recién con el primer texto que parece fecha
+    try:
+        date = date_parse(text, dayfirst=True)
+    except (TypeError, OverflowError, ValueError):  # ParserError es un ValueError
+        return None
+    return (date.year, date.month)
+
+
+def _parse_period_cell(cell_value):
+    """
+    Interpreta una celda de encabezado como período y devuelve (año, mes)
+    o None. Para rangos ('inicio - fin') se toma la fecha de fin.
+    """
+    if cell_value is None or isinstance(cell_value, (bool, int, float, np.number)):
+        return None  # Vacíos e importes no son encabezados de período
+    if isinstance(cell_value, (datetime.datetime, datetime.date)):
+        if pd.isna(cell_value):
+            return None
+        return (cell_value.year, cell_value.month)
+    # Convertir a string y dividir por " - " (espacio-guion-espacio).
+    # Tomamos el último elemento (-1) por si es un rango.
+    return _parse_period_text(str(cell_value).split(' - ')[-1].strip())
+
+
+def _excel_number(value):
+    """
+    Un importe float64 de la lectura proyectada tal como lo devuelve
+    read_excel: los valores enteros como int (5 y no 5.0 en los mensajes).
+    """
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return value
+
+
+def _compact_sheet(df, text_cols, value_cols, num_cols):
+    """
+    Tipos compactos para una hoja proyectada: las columnas de importes
+    pasan a float64 (mismo criterio que pd.to_numeric(errors='coerce'):
+    lo que no es número queda en NaN) y las de títulos a strings, con NaN
+    en las celdas que no son texto (nunca tienen un título).
+    """
+    compact = {}
+    for col_idx in df.columns:
+        column = df[col_idx].astype(object)
+        if col_idx in value_cols:
+            compact[col_idx] = pd.to_numeric(column, errors='coerce').astype(np.float64)
+        else:
+            compact[col_idx] = column.where(column.map(lambda value: isinstance(value, str))).astype('str')
+    compact = pd.DataFrame(compact, index=df.index, columns=df.columns)
+    compact.attrs['num_cols'] = num_cols
+    return compact
+
+
+class WorkbookSession:
+    """
+    Abre un archivo Excel UNA sola vez por corrida de comparación y mantiene
+    en memoria lo ya leído de cada hoja: las primeras filas (auto-detección)
+    y la lectura proyectada con solo las columnas que se comparan
+    (projected), en lugar de volver a descomprimir y parsear el .xlsx en
+    cada paso.
+
+    Con `streaming=True` (solo .xlsx, motor openpyxl) las filas se leen de a
+    poco con iter_rows() en lugar de materializar la hoja entera.
+
+    El archivo se abre recién cuando se necesita (open() o el primer acceso),
+    así una corrida servida completa desde el SheetCache no lo toca.
+    """
+
+    def __init__(self, file_path, streaming=False):
+        self.file_path = file_path
+        self._streaming = streaming
+        self._excel = None
+        self._sheets = {}
+        self._heads = {}
+        self._projected = {}
+        # Un lock por hoja: varios hilos pueden pedir hojas distintas a la vez
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._sheet_locks = defaultdict(threading.RLock)
+
+    def open(self):
+        """Abre el archivo Excel (una sola vez)."""
+        with self._open_lock:
+            if self._excel is None:
+                self._excel = pd.ExcelFile(self.file_path)
+        return self._excel
+
+    @property
+    def sheet_names(self):
+        return self.open().sheet_names
+
+    @property
+    def row_access(self):
+        """True si el archivo se puede leer por filas (iter_rows): .xlsx con openpyxl."""
+        return self.open().engine == 'openpyxl'
+
+    @property
+    def streaming(self):
+        return self._streaming and self.row_access
+
+    def _sheet_lock(self, sheet_idx):
+        with self._lock:
+            return self._sheet_locks[sheet_idx]
+
+    def sheet(self, sheet_idx):
+        """Devuelve la hoja completa, parseándola solo la primera vez."""
+        with self._sheet_lock(sheet_idx):
+            if sheet_idx not in self._sheets:
+                self._sheets[sheet_idx] = self.open().parse(sheet_name=sheet_idx, header=None)
+        return self._sheets[sheet_idx]
+
+    def head(self, sheet_idx, nrows):
+        """Primeras `nrows` filas de la hoja (sin parsear el resto)."""
+        if sheet_idx in self._sheets:
+            return self._sheets[sheet_idx].iloc[:nrows]
+        with self._sheet_lock(sheet_idx):
+            if (sheet_idx, nrows) not in self._heads:
+                if self.row_access:
+                    head = pd.DataFrame(list(self.iter_rows(sheet_idx, max_row=nrows)))
+                else:
+                    head = self.open().parse(sheet_name=sheet_idx, header=None, nrows=nrows)
+                self._heads[(sheet_idx, nrows)] = head
+            return self._heads[(sheet_idx, nrows)]
+
+    def projected(self, sheet_idx, text_cols, value_cols):
+        """
+        Lectura proyectada: solo las columnas `text_cols` (títulos) y
+        `value_cols` (importes), índices 0-based, con tipos compactos
+        (ver _compact_sheet). El resto de las columnas se descarta al leer,
+        así la memoria de la hoja depende de las columnas que se comparan y
+        no del ancho del libro (comentarios, fórmulas, consolidaciones...).
+
+        Las columnas del DataFrame conservan su índice original (df[3] es la
+        columna D) y las filas su posición en la hoja. Las columnas pedidas
+        que quedan fuera de la hoja no se incluyen; el ancho real de la hoja
+        queda en df.attrs['num_cols'].
+        """
+        key = (sheet_idx, tuple(text_cols), tuple(value_cols))
+        with self._sheet_lock(sheet_idx):
+            if key not in self._projected:
+                columns = sorted(set(text_cols) | set(value_cols))
+                if sheet_idx in self._sheets or not self.row_access:
+                    # .xls (o la hoja ya parseada): se selecciona sobre el read_excel
+                    # completo, parseado una sola vez para todas las proyecciones
+                    full = self.sheet(sheet_idx)
+                    num_cols = len(full.columns)
+                    raw = full[[col_idx for col_idx in columns if col_idx < num_cols]]
+                else:
+                    raw, num_cols = self._read_columns(sheet_idx, columns)
+                self._projected[key] = _compact_sheet(raw, text_cols, value_cols, num_cols)
+            return self._projected[key]
+
+    def _worksheet(self, sheet_idx):
+        """
+        Hoja openpyxl lista para iterar. En modo read-only se descarta el
+        <dimension> declarado en el XML (muchos generadores escriben "A1" o
+        un rango viejo) y se lee lo que la hoja tiene de verdad, como hace
+        pandas.
+        """
+        book = self.open().book
+        worksheet = book.worksheets[sheet_idx]
+        if book.read_only:
+            worksheet.reset_dimensions()
+        return worksheet
+
+    def _read_columns(self, sheet_idx, columns):
+        """(DataFrame, ancho de la hoja) con solo `columns`, leyendo fila por fila con openpyxl."""
+        worksheet = self._worksheet(sheet_idx)
+        width = columns[-1] + 1
+        pick = itemgetter(*columns) if len(columns) > 1 else (lambda row: (row[columns[0]],))
+        num_cols = 0
+        records = []
+        for row in worksheet.iter_rows(values_only=True):
+            # Ancho real: hasta la última celda con contenido (igual que read_excel)
+            used = len(row)
+            while used and (row[used - 1] is None or row[used - 1] == ''):
+                used -= 1
+            if used > num_cols:
+                num_cols = used
+            if len(row) < width:
+                row = [*row, *[None] * (width - len(row))]
+            records.append(pick(row))
+        raw = pd.DataFrame.from_records(records, columns=columns)
+        return raw[[col_idx for col_idx in columns if col_idx < num_cols]], num_cols
+
+    def iter_rows(self, sheet_idx, start_row=0, max_row=None, max_col=None):
+        """
+        Iterador perezoso de filas (tuplas de valores) desde `start_row`
+        (0-based). Solo disponible para .xlsx (ver row_access).
+        """
+        if not self.row_access:
+            raise ValueError(f"'{os.path.basename(self.file_path)}' no admite lectura en streaming.")
+        worksheet = self._worksheet(sheet_idx)
+        return worksheet.iter_rows(min_row=start_row + 1, max_row=max_row, max_col=max_col, values_only=True)
+
+    def close(self):
+        self._sheets.clear()
+        self._heads.clear()
+        self._projected.clear()
+        if self._excel is not None:
+            self._excel.close()
+            self._excel = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _default_cache_dir():
+    """Directorio de caché del usuario (LOCALAPPDATA en Windows, ~/.cache en Linux)."""
+    base = os.environ.get('LOCALAPPDATA') if os.name == 'nt' else os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ComparadorEstadosFinancieros')
+
+
+class SheetCache:
+    """
+    Caché en disco de las hojas ya detectadas y extraídas (configuración de
+    _detect_columns + registros de título/actual/anterior), en formato
+    columnar binario de NumPy (.npz, un archivo por hoja).
+
+    La clave es el hash del CONTENIDO del archivo + índice de hoja + período
+    (+ modo de lectura), así que al re-ejecutar una comparación donde solo
+    cambió un archivo, únicamente ese archivo se vuelve a parsear. Cuando el
+    directorio supera `max_bytes` se borran primero las entradas usadas hace
+    más tiempo.
+    """
+
+    # Subir este número si cambia el formato o la lógica de extracción
+    VERSION = 1
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir or _default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self._hashes = {}
+
+    def file_hash(self, file_path):
+        """Hash del contenido, memoizado por (ruta, mtime, tamaño) dentro del proceso."""
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._hashes:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(file_path, 'rb') as excel_file:
+                for block in iter(lambda: excel_file.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._hashes[memo_key] = digest.hexdigest()
+        return self._hashes[memo_key]
+
+    def _entry_path(self, file_path, sheet_idx, year, month, streaming):
+        mode = 'stream' if streaming else 'full'
+        name = f"{self.file_hash(file_path)}_h{sheet_idx}_{year}{month:02d}_{mode}_v{self.VERSION}.npz"
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, file_path, sheet_idx, year, month, streaming=False):
+        """
+        Devuelve {'sheet_name', 'config', 'start_row', 'data'} o None si la hoja
+        no está en caché (una entrada ilegible se borra y cuenta como ausente).
+        Los registros se devuelven como dicts nuevos ('matched': False), igual
+        que _process_dataframe.
+        """
+        entry_path = self._entry_path(file_path, sheet_idx, year, month, streaming)
+        try:
+            with np.load(entry_path, allow_pickle=False) as arrays:
+                meta = json.loads(str(arrays['meta']))
+                columns = {key: arrays[key].tolist() for key in arrays.files if key != 'meta'}
+            entry = {'sheet_name': meta['sheet_name'], 'config': meta['config'],
+                     'start_row': meta['start_row'], 'data': []}
+            for num, text, full_title, actual, actual_int, anterior, anterior_int, row_num in zip(
+                    columns['num'], columns['text'], columns['full_title'], columns['actual'], columns['actual_int'],
+                    columns['anterior'], columns['anterior_int'], columns['row_num']):
+                entry['data'].append({
+                    'num': num, 'text': text, 'full_title': full_title,
+                    'actual': int(actual) if actual_int else actual,
+                    'anterior': int(anterior) if anterior_int else anterior,
+                    'matched': False, 'row_num': row_num
+                })
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, EOFError, zipfile.BadZipFile):
+            # Entrada corrupta o truncada (ej: corrida cortada, disco lleno): se
+            # borra y la hoja se vuelve a parsear como si no estuviera en caché
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(entry_path)  # Marca de "usado recientemente" para la evicción
+        except OSError:
+            pass  # La evicción de otro proceso la borró: los datos ya se leyeron
+        self.hits += 1
+        return entry
+
+    def store(self, file_path, sheet_idx, year, month, streaming, sheet_name, config, start_row, data):
+        """Guarda una hoja extraída (escritura atómica) y aplica la evicción por tamaño."""
+        def is_int(value):
+            return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+        meta = {'sheet_name': sheet_name, 'config': config,
+                'start_row': None if start_row is None else int(start_row)}
+        arrays = {
+            'meta': np.array(json.dumps(meta)),
+            'num': np.array([item['num'] for item in data], dtype=str),
+            'text': np.array([item['text'] for item in data], dtype=str),
+            'full_title': np.array([item['full_title'] for item in data], dtype=str),
+            'actual': np.array([item['actual'] for item in data], dtype=np.float64),
+            'actual_int': np.array([is_int(item['actual']) for item in data], dtype=bool),
+            'anterior': np.array([item['anterior'] for item in data], dtype=np.float64),
+            'anterior_int': np.array([is_int(item['anterior']) for item in data], dtype=bool),
+            'row_num': np.array([item['row_num'] for item in data], dtype=np.int64),
+        }
+        entry_path = self._entry_path(file_path, sheet_idx, year, month, streaming)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as tmp_file:
+            np.savez(tmp_file, **arrays)
+        os.replace(tmp_path, entry_path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Otro proceso la borró
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class MemorySheetCache:
+    """
+    Variante en memoria del SheetCache (misma interfaz) para re-comparar
+    los mismos archivos varias veces en un proceso: una hoja se vuelve a
+    extraer solo si su archivo cambió (fecha de modificación o tamaño).
+    La firma de cada archivo se toma en file_hash(), al inicio de cada
+    corrida, y vale para toda la corrida. Con `max_entries` guarda a lo sumo
+    esa cantidad de hojas (se descartan primero las usadas hace más tiempo).
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self.hits = 0
+        self._signatures = {}
+        self._entries = OrderedDict()
+
+    def file_hash(self, file_path):
+        stat = os.stat(file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        self._signatures[os.path.abspath(file_path)] = signature
+        return signature
+
+    def _signature(self, file_path):
+        path = os.path.abspath(file_path)
+        return self._signatures.get(path) or self.file_hash(path)
+
+    def load(self, file_path, sheet_idx, year, month, streaming=False):
+        key = (os.path.abspath(file_path), sheet_idx, year, month, streaming)
+        entry = self._entries.get(key)
+        if entry is None or entry['signature'] != self._signature(file_path):
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Copias: la búsqueda de coincidencias marca 'matched' en los items
+        return dict(entry, data=[dict(item, matched=False) for item in entry['data']])
+
+    def store(self, file_path, sheet_idx, year, month, streaming, sheet_name, config, start_row, data):
+        key = (os.path.abspath(file_path), sheet_idx, year, month, streaming)
+        self._entries[key] = {'signature': self._signature(file_path), 'sheet_name': sheet_name,
+                              'config': config, 'start_row': start_row,
+                              'data': [dict(item, matched=False) for item in data]}
+        self._entries.move_to_end(key)
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class Finding:
+    """
+    Un hallazgo de la comparación, como registro compacto (__slots__).
+    `kind` indica el tipo y render() arma el mensaje del reporte de texto.
+    Las filas de estado ('hoja', 'estado') no son hallazgos: solo sirven
+    para el reporte y el progreso.
+    """
+    __slots__ = ('kind', 'sheet', 'side', 'row_num', 'title', 'period',
+                 'other_row_num', 'other_title', 'cliente_value', 'salida_value',
+                 'actual_value', 'anterior_value', 'detail', 'similarity', 'children_value')
+
+    # Columnas de las exportaciones (mismo orden que __slots__)
+    FIELDS = __slots__
+
+    # kind -> plantilla del mensaje. 'error', 'error_critico', 'advertencia'
+    # y 'estado' guardan el mensaje completo en `detail`.
+    _TEMPLATES = {
+        'hoja': "\n",
+        'cliente_cero': "[{context}] '{title}': Cliente es 0, pero Salida reporta valor (Escalado: {salida_value}).",
+        'discrepancia': "[{context}] '{title}': DISCREPANCIA . Cliente: {cliente_value}, Salida (Escalado): {salida_value}.",
+        'coincidencia_texto': "[{context}] [AVISO] Coincidencia por TEXTO: Cliente ('{title}') vs Salida ('{other_title}')",
+        'coincidencia_aproximada': "[{context}] [AVISO] Coincidencia APROXIMADA ({similarity:.0%}): Cliente ('{title}') vs Salida ('{other_title}')",
+        'falta': "[{context}] (Fila Cliente: {row_num}) '{title}': Título FALTA en Salida (Valores Cliente: {actual_value}, {anterior_value}).",
+        'sobra': "[{context}] (Fila Salida: {row_num}) '{title}': Título SOBRA en Salida, no existe en Cliente (Valores Salida escalados: {actual_value}, {anterior_value}).",
+        'subtotal': "[{context}] (Fila {side_label}: {row_num}) '{title}': SUBTOTAL de {side_label} distinto de la suma de sus subcuentas (Subtotal: {value}, Suma: {children_value}).",
+    }
+    STATUS_KINDS = frozenset(('hoja', 'estado'))
+    ERROR_KINDS = frozenset(('error', 'error_critico'))
+    # Campos que NO identifican al hallazgo entre corridas: insertar o borrar
+    # filas corre los números de fila sin que el hallazgo cambie.
+    POSITION_FIELDS = frozenset(('row_num', 'other_row_num'))
+
+    def __init__(self, kind, sheet=None, side=None, row_num=None, title=None, period=None,
+                 other_row_num=None, other_title=None, cliente_value=None, salida_value=None,
+                 actual_value=None, anterior_value=None, detail=None, similarity=None, children_value=None):
+        self.kind = kind
+        self.sheet = sheet
+        self.side = side
+        self.row_num = row_num
+        self.title = title
+        self.period = period
+        self.other_row_num = other_row_num
+        self.other_title = other_title
+        self.cliente_value = cliente_value
+        self.salida_value = salida_value
+        self.actual_value = actual_value
+        self.anterior_value = anterior_value
+        self.detail = detail
+        self.similarity = similarity
+        self.children_value = children_value
+
+    def __repr__(self):
+        return f"Finding({self.kind!r}, {self.render()!r})"
+
+    @property
+    def is_status(self):
+        return self.kind in self.STATUS_KINDS
+
+    def render(self):
+        """Mensaje del reporte de texto (mismo formato de siempre)."""
+        template = self._TEMPLATES.get(self.kind)
+        if template is None:
+            return self.detail
+        context = self.sheet if self.period is None else f"{self.sheet} [{self.period}]"
+        # Hallazgos de un solo archivo ('subtotal'): su valor está en el campo de su lado
+        side_label, value = ('Salida', self.salida_value) if self.side == 'salida' else ('Cliente', self.cliente_value)
+        return template.format(context=context, title=self.title, other_title=self.other_title,
+                               row_num=self.row_num, cliente_value=self.cliente_value,
+                               salida_value=self.salida_value, actual_value=self.actual_value,
+                               anterior_value=self.anterior_value, similarity=self.similarity,
+                               side_label=side_label, value=value, children_value=self.children_value)
+
+    @property
+    def diff_key(self):
+        """Identidad del hallazgo para comparar dos corridas (sin números de fila)."""
+        return tuple(getattr(self, field) for field in self.FIELDS if field not in self.POSITION_FIELDS)
+
+    def copy(self, **changes):
+        """Copia del hallazgo con los campos de `changes` reemplazados."""
+        values = {field: getattr(self, field) for field in self.FIELDS}
+        values.update(changes)
+        return Finding(**values)
+
+    def to_dict(self):
+        """Registro plano con tipos nativos de Python (apto para JSON/CSV)."""
+        record = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            record[field] = value.item() if isinstance(value, np.generic) else value
+        return record
+
+
+class ComparisonResult:
+    """
+    Resultado estructurado de una comparación: la lista ordenada de Finding
+    (incluidas las filas de estado). Permite filtrar, agregar y exportar
+    los hallazgos sin pasar por el reporte de texto.
+    """
+
+    def __init__(self, findings=None):
+        self.findings = list(findings) if findings is not None else []
+
+    def __iter__(self):
+        return iter(self.findings)
+
+    def __len__(self):
+        return len(self.findings)
+
+    def append(self, finding):
+        self.findings.append(finding)
+
+    def extend(self, findings):
+        self.findings.extend(findings)
+
+    def clear(self):
+        self.findings.clear()
+
+    def issues(self):
+        """Hallazgos del reporte, sin las filas de estado."""
+        return [finding for finding in self.findings if not finding.is_status]
+
+    def filter(self, kind=None, sheet=None, side=None, period=None):
+        """
+        Hallazgos (sin filas de estado) que cumplen todos los criterios dados.
+        Cada criterio acepta un valor o una colección de valores.
+        """
+        criteria = [(name, {value} if isinstance(value, str) or not hasattr(value, '__iter__') else set(value))
+                    for name, value in (('kind', kind), ('sheet', sheet), ('side', side), ('period', period))
+                    if value is not None]
+        return [finding for finding in self.issues()
+                if all(getattr(finding, name) in values for name, values in criteria)]
+
+    def counts(self, by='kind'):
+        """Cantidad de hallazgos por valor de un campo (o tupla de campos)."""
+        fields = (by,) if isinstance(by, str) else tuple(by)
+        totals = defaultdict(int)
+        for finding in self.issues():
+            key = getattr(finding, fields[0]) if len(fields) == 1 else tuple(getattr(finding, f) for f in fields)
+            totals[key] += 1
+        return dict(totals)
+
+    @property
+    def has_errors(self):
+        return any(finding.kind in Finding.ERROR_KINDS for finding in self.findings)
+
+    def to_records(self):
+        return [finding.to_dict() for finding in self.issues()]
+
+    def to_frame(self):
+        """Hallazgos como DataFrame (una columna por campo de Finding)."""
+        issues = self.issues()
+        return pd.DataFrame({field: [getattr(finding, field) for finding in issues] for field in Finding.FIELDS},
+                            columns=list(Finding.FIELDS))
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=Finding.FIELDS)
+            writer.writeheader()
+            writer.writerows(self.to_records())
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as json_file:
+            json.dump(self.to_records(), json_file, ensure_ascii=False, indent=1)
+
+    def to_excel(self, path):
+        self.to_frame().to_excel(path, index=False, sheet_name='Hallazgos')
+
+    def export(self, path):
+        """Exporta según la extensión de `path`: .csv, .json o .xlsx."""
+        extension = os.path.splitext(path)[1].lower()
+        exporters = {'.csv': self.to_csv, '.json': self.to_json, '.xlsx': self.to_excel}
+        if extension not in exporters:
+            raise ValueError(f"Formato de exportación no soportado: '{extension}'. Use .csv, .json o .xlsx.")
+        exporters[extension](path)
+
+    def diff(self, previous):
+        """
+        FindingsDiff de este resultado contra el de una corrida anterior
+        (`previous`, ComparisonResult o None). Los hallazgos se comparan por
+        Finding.diff_key, contando repetidos.
+        """
+        previous_issues = previous.issues() if previous is not None else []
+        pending = defaultdict(list)
+        for finding in previous_issues:
+            pending[finding.diff_key].append(finding)
+        new, unchanged = [], []
+        for finding in self.issues():
+            matches = pending.get(finding.diff_key)
+            if matches:
+                matches.pop(0)
+                unchanged.append(finding)
+            else:
+                new.append(finding)
+        resolved = [finding for finding in previous_issues if finding in pending[finding.diff_key]]
+        return FindingsDiff(new, resolved, unchanged)
+
+    def render_text(self):
+        """Reporte de texto de compare(), armado a partir de los hallazgos."""
+        lines = [finding.render() for finding in self.findings if finding.kind != 'estado']
+        if not lines:
+            return "--- PROCESO COMPLETADO --- \n\n¡No se encontraron inconsistencias!"
+        return "--- PROCESO COMPLETADO --- \n\nSe encontraron las siguientes inconsistencias:\n\n" + "\n".join(lines)
+
+
+class FindingsDiff:
+    """
+    Diferencia entre los hallazgos de dos corridas sobre los mismos
+    archivos: nuevos, resueltos (estaban y ya no) y sin cambios.
+    """
+
+    def __init__(self, new, resolved, unchanged):
+        self.new = new
+        self.resolved = resolved
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return bool(self.new or self.resolved)
+
+    def counts(self):
+        return {'nuevos': len(self.new), 'resueltos': len(self.resolved), 'sin_cambios': len(self.unchanged)}
+
+    def render_text(self):
+        """Resumen de texto: totales y el detalle de nuevos y resueltos."""
+        counts = self.counts()
+        lines = [f"--- CAMBIOS --- {counts['nuevos']} nuevos, {counts['resueltos']} resueltos, "
+                 f"{counts['sin_cambios']} sin cambios."]
+        for title, findings in (("NUEVOS", self.new), ("RESUELTOS", self.resolved)):
+            if findings:
+                lines.append(f"\n{title}:")
+                lines.extend(f"  {finding.render()}" for finding in findings)
+        return "\n".join(lines)
+
+
+class StageTiming:
+    """Tiempo, filas y pico de memoria de UNA etapa (de una hoja o de la corrida)."""
+    __slots__ = ('stage', 'sheet', 'side', 'seconds', 'rows', 'peak_bytes')
+
+    FIELDS = __slots__
+
+    def __init__(self, stage, sheet=None, side=None, seconds=0.0, rows=None, peak_bytes=None):
+        self.stage = stage
+        self.sheet = sheet
+        self.side = side
+        self.seconds = seconds
+        self.rows = rows
+        self.peak_bytes = peak_bytes
+
+    def __repr__(self):
+        return f"StageTiming({self.stage!r}, sheet={self.sheet!r}, side={self.side!r}, seconds={self.seconds:.4f})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class ComparisonProfile:
+    """
+    Perfil de una corrida de compare(): una StageTiming por etapa y hoja
+    (apertura, lectura, deteccion, extraccion, coincidencias, validacion,
+    faltantes y, si se piden, subtotales), en el orden de sheet_map. `peak_bytes` solo se mide con
+    ExcelComparator(profile_memory=True) (tracemalloc: memoria reservada
+    desde Python, aproximada si los pares corren en hilos).
+    """
+    STAGES = ('apertura', 'lectura', 'deteccion', 'extraccion', 'coincidencias', 'validacion', 'faltantes', 'subtotales')
+
+    def __init__(self):
+        self.stages = []
+        self.total_seconds = 0.0
+
+    def __iter__(self):
+        return iter(self.stages)
+
+    def __len__(self):
+        return len(self.stages)
+
+    def extend(self, timings):
+        self.stages.extend(timings)
+
+    def by_stage(self):
+        """{etapa: {'seconds', 'rows', 'peak_bytes'}} sumando todas las hojas (pico: el máximo)."""
+        totals = {}
+        for timing in self.stages:
+            total = totals.setdefault(timing.stage, {'seconds': 0.0, 'rows': None, 'peak_bytes': None})
+            total['seconds'] += timing.seconds
+            if timing.rows is not None:
+                total['rows'] = (total['rows'] or 0) + timing.rows
+            if timing.peak_bytes is not None:
+                total['peak_bytes'] = max(total['peak_bytes'] or 0, timing.peak_bytes)
+        order = {stage: pos for pos, stage in enumerate(self.STAGES)}
+        return dict(sorted(totals.items(), key=lambda item: order.get(item[0], len(order))))
+
+    def by_sheet(self):
+        """{hoja: segundos} en el orden en que se procesaron."""
+        totals = {}
+        for timing in self.stages:
+            if timing.sheet is not None:
+                totals[timing.sheet] = totals.get(timing.sheet, 0.0) + timing.seconds
+        return totals
+
+    def to_records(self):
+        return [timing.to_dict() for timing in self.stages]
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_records(), columns=list(StageTiming.FIELDS))
+
+    @classmethod
+    def from_records(cls, records, total_seconds=0.0):
+        """Perfil a partir de registros de to_records() (por ejemplo, de varios pares de un lote)."""
+        profile = cls()
+        profile.stages = [StageTiming(**record) for record in records]
+        profile.total_seconds = total_seconds
+        return profile
+
+    def summary(self, per_sheet=True):
+        """Pie de reporte con el tiempo por etapa y (opcional) por hoja."""
+        lines = [f"--- PERFIL DE LA CORRIDA ({self.total_seconds:.3f} s en total) ---",
+                 f"{'Etapa':<15}{'Segundos':>10}{'Filas':>10}{'Pico MB':>10}"]
+        for stage, total in self.by_stage().items():
+            rows = '-' if total['rows'] is None else str(total['rows'])
+            peak = '-' if total['peak_bytes'] is None else f"{total['peak_bytes'] / (1024 * 1024):.2f}"
+            lines.append(f"{stage:<15}{total['seconds']:>10.3f}{rows:>10}{peak:>10}")
+        sheets = self.by_sheet() if per_sheet else None
+        if sheets:
+            lines.append("Por hoja:")
+            lines.extend(f"  {sheet}: {seconds:.3f} s" for sheet, seconds in sheets.items())
+        return "\n".join(lines)
+
+
+class ComparisonCancelled(Exception):
+    """La comparación se canceló (ExcelComparator.cancel()) entre dos etapas."""
+
 
 class ExcelComparator:
     """
-    Contiene toda la lógica de negocio. 
-    Auto-detecta las columnas EN CADA HOJA.
+    Contiene toda la lógica de negocio. 
+    Auto-detecta las columnas EN CADA HOJA.
+    """
+    
+    # --- MÉTODO __init__ ACTUALIZADO ---
+    # Ya no necesita self.cliente_config ni self.salida_config
+    def __init__(self, cliente_path, salida_path, year, month, parallel=None, streaming=False, cache=None,
+                 progress_callback=None, profile_memory=False, fuzzy_threshold=None, check_subtotals=False):
+        self.cliente_path = cliente_path
+        self.salida_path = salida_path
+        self.year = year
+        self.month = month
+        # Hallazgos de la última corrida (ComparisonResult); compare()
+        # devuelve su reporte de texto.
+        self.result = ComparisonResult()
+
+        # Procesamiento de los pares de hojas: None (en serie), 'thread' o 'process'
+        self.parallel = parallel
+
+        # Streaming: lee las filas de a bloques y corta el bloque del estado
+        # con la regla de MAX_EMPTY_TITLE_ROWS, sin cargar el resto de la hoja
+        self.streaming = streaming
+
+        # SheetCache opcional: hojas ya extraídas en corridas anteriores
+        self.cache = cache
+
+        # Mapeo de hojas (basado en índice 0-based de pandas)
+        self.sheet_map = [(2, 1), (3, 2), (4, 3)]
+
+        # Progreso: progress_callback(event, **detalle), con event 'stage'
+        # (etapa en curso) o 'sheet' (inicio/fin de un par de hojas; al
+        # terminar trae los hallazgos del par en 'findings'). Puede llamarse
+        # desde hilos de trabajo. cancel() corta la corrida entre etapas.
+        self.progress_callback = progress_callback
+        self._cancel_event = threading.Event()
+
+        # Perfil de la última corrida (ComparisonProfile): tiempos y filas por
+        # etapa y hoja. Con profile_memory también el pico de memoria
+        # (tracemalloc, que hace la corrida más lenta).
+        self.profile = ComparisonProfile()
+        self.profile_memory = profile_memory
+
+        # Resultados por período de la última compare_periods(): {(año, mes): ComparisonResult}
+        self.period_results = {}
+
+        # Coincidencia aproximada de títulos (después de 6.B): None la
+        # desactiva; si no, la similitud mínima (0-1) entre los textos
+        if fuzzy_threshold is not None and not 0 < fuzzy_threshold <= 1:
+            raise ValueError(f"Umbral de coincidencia aproximada inválido: {fuzzy_threshold}. Debe estar entre 0 y 1.")
+        self.fuzzy_threshold = fuzzy_threshold
+
+        # Validación de subtotales por numeración de cuentas (_check_subtotals)
+        self.check_subtotals = check_subtotals
+
+    def __getstate__(self):
+        # Para parallel='process': el callback y el Event no viajan al proceso hijo
+        state = self.__dict__.copy()
+        state['progress_callback'] = None
+        state['_cancel_event'] = None
+        return state
+
+    def cancel(self):
+        """Pide cancelar la corrida; compare() lanza ComparisonCancelled en la próxima etapa."""
+        self._cancel_event.set()
+
+    def _check_cancelled(self):
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise ComparisonCancelled("Comparación cancelada por el usuario.")
+
+    def _notify(self, event, **details):
+        if self.progress_callback is not None:
+            self.progress_callback(event, **details)
+
+    # --- (Las siguientes funciones auxiliares NO CAMBIAN) ---
+
+    @contextmanager
+    def _stage(self, timings, stage, sheet, side=None):
+        """Mide una etapa y agrega su StageTiming a `timings` (también si falla)."""
+        timing = StageTiming(stage, sheet, side)
+        memory = self.profile_memory and tracemalloc.is_tracing()
+        if memory:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            timing.seconds = time.perf_counter() - started
+            if memory:
+                timing.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - base)
+            timings.append(timing)
+
+    def _col_to_int(self, col_str):
+        num = 0
+        for c in col_str:
+            num = num * 26 + (ord(c.upper()) - ord('A')) + 1
+        return num - 1
+
+    def _int_to_col(self, n):
+        string = ""
+        n_copy = n
+        while n_copy >= 0:
+            string = chr(n_copy % 26 + ord('A')) + string
+            n_copy = n_copy // 26 - 1
+        return string
+
+    def _parse_col_range(self, range_str):
+        try:
+            start_col, end_col = range_str.split(':')
+            start_idx = self._col_to_int(start_col)
+            end_idx = self._col_to_int(end_col)
+            return list(range(start_idx, end_idx + 1))
+        except Exception:
+            raise ValueError(f"Formato de rango de título inválido: '{range_str}'. Use 'A:F'.")
+
+    def _normalize_title(self, title):
+        if not isinstance(title, str):
+            return None
+        title = title.strip()
+        match = re.search(TITLE_PATTERN, title)
+        if match:
+            return (match.group(1).strip(), match.group(2).strip().lower())
+        return None
+
+    def _match_titles(self, column):
+        """
+        Versión columnar de _normalize_title: aplica TITLE_PATTERN a toda una
+        columna con operaciones de string vectorizadas.
+        Devuelve un DataFrame ('num', 'text', 'full_title') con SOLO las filas
+        que contienen un título válido (mismo índice que `column`).
+        """
+        vacio = pd.DataFrame(columns=['num', 'text', 'full_title'], dtype=object)
+        if not (pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)):
+            return vacio  # Columna puramente numérica/fechas: no hay títulos
+
+        try:
+            # .str sobre dtype object deja en NaN todo lo que no sea string
+            full_title = column.astype(object).str.strip()
+            partes = full_title.str.extract(TITLE_PATTERN)
+        except AttributeError:
+            return vacio  # La columna no tiene ninguna celda de texto
+        found = partes[0].notna()
+        if not found.any():
+            return vacio
+
+        return pd.DataFrame({
+            'num': partes.loc[found, 0].str.strip(),
+            'text': partes.loc[found, 1].str.strip().str.lower(),
+            'full_title': full_title[found],
+        })
+
+    def _extract_titles(self, df, col_indices):
+        """
+        Busca títulos en el bloque de columnas `col_indices` y se queda con
+        la PRIMERA columna que tenga título en cada fila (mismo criterio que
+        recorrer la fila de izquierda a derecha).
+        """
+        titles = None
+        for col_idx in col_indices:
+            if col_idx not in df.columns:
+                continue
+            col_titles = self._match_titles(df[col_idx])
+            if col_titles.empty:
+                continue
+            if titles is None:
+                titles = col_titles
+            else:
+                nuevos = col_titles.loc[~col_titles.index.isin(titles.index)]
+                titles = pd.concat([titles, nuevos])
+
+        if titles is None:
+            return pd.DataFrame(columns=['num', 'text', 'full_title'], dtype=object)
+        return titles.sort_index()
+
+    def _to_numeric_column(self, column):
+        """
+        Conversión en bloque equivalente a pd.to_numeric(celda, errors='coerce')
+        aplicado celda por celda. Los números que ya vienen del Excel se
+        conservan tal cual (int sigue siendo int, para que los mensajes no
+        cambien); el resto se coacciona de una sola vez.
+        """
+        if pd.api.types.is_numeric_dtype(column):
+            return column.tolist()
+
+        column = column.astype(object)
+        convertidos = pd.to_numeric(column, errors='coerce').tolist()
+        valores = []
+        for original, convertido in zip(column.tolist(), convertidos):
+            if isinstance(original, (int, float, np.number)):
+                valores.append(original)
+            elif isinstance(original, str) and pd.notna(convertido):
+                # Texto numérico (poco frecuente): mismo tipo que la versión escalar
+                valores.append(pd.to_numeric(original, errors='coerce'))
+            else:
+                valores.append(convertido)
+        return valores
+
+    def _sheet_columns(self, config):
+        """(columnas de títulos, columnas de importes) que usa la comparación de una hoja."""
+        return (self._parse_col_range(config['title_range']),
+                [self._col_to_int(config['actual_col']), self._col_to_int(config['anterior_col'])])
+
+    def _load_sheet(self, session, sheet_idx, text_cols, value_cols):
+        """Lectura proyectada de la hoja (WorkbookSession.projected), una vez detectadas sus columnas."""
+        try:
+            return session.projected(sheet_idx, text_cols, value_cols)
+        except Exception as e:
+            raise ValueError(f"No se pudo leer la hoja {sheet_idx+1} de {os.path.basename(session.file_path)}. Detalle: {e}")
+
+    def _find_start_row(self, df, col_range_str):
+        col_indices = self._parse_col_range(col_range_str)
+        titles = self._extract_titles(df, col_indices)
+        if titles.empty:
+            return None
+        return titles.index[0]
+
+    def _load_head(self, session, sheet_idx):
+        """Primeras 120 filas de la hoja, que es lo que mira la auto-detección."""
+        try:
+            return session.head(sheet_idx, 120)
+        except Exception as e:
+            raise ValueError(f"No se pudo leer la hoja {sheet_idx+1} de {os.path.basename(session.file_path)}. Detalle: {e}")
+
+    def _scan_period_columns(self, df):
+        """
+        Recorre las celdas de las columnas D hasta L y devuelve
+        {(año, mes): índice de columna} con la PRIMERA columna (de izquierda
+        a derecha) en la que aparece cada período.
+        """
+        periodo_search_cols = list(range(3, 12)) # D(3) a L(11)
+        found = {}
+        for col_idx in periodo_search_cols:
+            if col_idx >= len(df.columns):
+                continue
+            for cell_value in df.iloc[:, col_idx].tolist():
+                # Ruta rápida + memo (ver _parse_period_cell); None = no es fecha
+                period = _parse_period_cell(cell_value)
+                if period is not None and period not in found:
+                    found[period] = col_idx
+        return found
+
+    def _period_not_found_error(self, file_path, sheet_idx, year, month):
+        return ValueError(f"AUTO-DETECCIÓN FALLIDA (Período):\nNo se pudo encontrar una columna de fecha con {month:02d}/{year} en '{os.path.basename(file_path)}' (Hoja {sheet_idx+1}, Cols D-L).")
+
+    def _detect_title_range(self, df, file_path, sheet_idx):
+        """Rango de columnas (ej: 'A:B') con títulos de cuenta, dentro de A-F."""
+        title_search_cols = list(range(0, 6)) # A(0) a F(5)
+        found_title_cols = [] 
+
+        for col_idx in title_search_cols:
+            if col_idx >= len(df.columns):
+                continue
+            if not self._match_titles(df.iloc[:, col_idx]).empty:
+                found_title_cols.append(col_idx)
+
+        if not found_title_cols:
+            raise ValueError(f"AUTO-DETECCIÓN FALLIDA (Títulos):\nNo se pudo encontrar ninguna columna con Títulos en '{os.path.basename(file_path)}' (Hoja {sheet_idx+1}, Cols A-F).")
+
+        min_col = min(found_title_cols)
+        max_col = max(found_title_cols)
+        return f"{self._int_to_col(min_col)}:{self._int_to_col(max_col)}"
+
+    def _detect_columns(self, session, sheet_idx):
+        """
+        Auto-detecta el rango de títulos y las columnas de período 
+        para un archivo y hoja específicos (usa las primeras 120 filas).
+        Ahora maneja rangos de fechas (ej: 'YYYY-MM-DD - YYYY-MM-DD').
+        Recibe la WorkbookSession del archivo: no vuelve a leer el Excel.
+        """
+        df = self._load_head(session, sheet_idx)
+
+        # --- 1. Detección de Columna de Período (Columnas D hasta L) ---
+        col_idx = self._scan_period_columns(df).get((self.year, self.month))
+        if col_idx is None:
+            raise self._period_not_found_error(session.file_path, sheet_idx, self.year, self.month)
+        actual_col = self._int_to_col(col_idx)
+        anterior_col = self._int_to_col(col_idx + 1)
+
+        # --- 2. Detección de Rango de Títulos (Columnas A hasta F) ---
+        title_range = self._detect_title_range(df, session.file_path, sheet_idx)
+
+        # --- 3. Retornar Configuración ---
+        return {
+            'title_range': title_range,
+            'actual_col': actual_col,
+            'anterior_col': anterior_col
+        }
+
+    def _process_dataframe(self, df, start_row, config):
+        """
+        Extrae los datos relevantes (título, actual, anterior) del DataFrame
+        y los devuelve en una LISTA de diccionarios.
+        
+        Recorre la hoja completa; la regla de corte por 4 filas consecutivas
+        sin un título válido se aplica en modo streaming (_stream_dataframe).
+        """
+        data_list = []
+        if start_row is None:
+            return data_list
+
+        try:
+            title_col_indices = self._parse_col_range(config['title_range'])
+            actual_col_idx = self._col_to_int(config['actual_col'])
+            anterior_col_idx = self._col_to_int(config['anterior_col'])
+        except Exception as e:
+            raise ValueError(f"Error en configuración de columnas: {e}")
+
+        # Ancho real de la hoja (una hoja proyectada no trae todas sus columnas)
+        num_cols = df.attrs.get('num_cols', len(df.columns))
+        if actual_col_idx not in df.columns or anterior_col_idx not in df.columns:
+             raise IndexError(f"CONFIGURACIÓN INVÁLIDA: Las columnas de período (Actual: {config['actual_col']}, Anterior: {config['anterior_col']}) están fuera de los límites. El archivo solo tiene {num_cols} columnas.")
+        
+        max_title_col = max(title_col_indices)
+        if max_title_col >= num_cols:
+            print(f"Advertencia: El Rango de Títulos ('{config['title_range']}') incluye una columna (índice {max_title_col}) que está fuera de los límites. El archivo solo tiene {num_cols} columnas.")
+
+        df_subset = df.iloc[start_row:]
+
+        # 1. Encontrar el título de cada fila (columnar, primera columna con título)
+        titles = self._extract_titles(df_subset, title_col_indices)
+        if titles.empty:
+            return data_list
+
+        # 2. Extraer los valores de las filas con título en una sola conversión
+        actual_vals = self._to_numeric_column(df_subset[actual_col_idx].loc[titles.index])
+        anterior_vals = self._to_numeric_column(df_subset[anterior_col_idx].loc[titles.index])
+
+        for index, number, text, original_full_title, actual_val, anterior_val in zip(
+                titles.index, titles['num'], titles['text'], titles['full_title'], actual_vals, anterior_vals):
+            data_list.append({
+                'num': number, 'text': text, 'full_title': original_full_title,
+                'actual': actual_val, 'anterior': anterior_val, 'matched': False,
+                'row_num': index + 1  # <-- ¡AQUÍ SE GUARDA EL NÚMERO DE FILA (1-based)!
+            })
+
+        return data_list
+
+    def _stream_dataframe(self, session, sheet_idx, config, chunk_rows=256):
+        """
+        Extracción en modo streaming: lee la hoja de a bloques de `chunk_rows`
+        filas (solo las columnas necesarias), ubica la fila de inicio y deja
+        de leer apenas encuentra MAX_EMPTY_TITLE_ROWS filas consecutivas sin
+        título. Devuelve (start_row, data_list), como _find_start_row +
+        _process_dataframe.
+        """
+        title_col_indices = self._parse_col_range(config['title_range'])
+        needed_cols = max(title_col_indices + [self._col_to_int(config['actual_col']),
+                                               self._col_to_int(config['anterior_col'])]) + 1
+
+        start_row = None
+        data_list = []
+        empty_rows = 0
+        block_start = 0
+        rows = session.iter_rows(sheet_idx, max_col=needed_cols)
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_rows))
+                if not chunk:
+                    break
+                block = pd.DataFrame(chunk, index=range(block_start, block_start + len(chunk)),
+                                     columns=range(needed_cols))
+                block_start += len(chunk)
+
+                titles = self._extract_titles(block, title_col_indices)
+                if start_row is None:
+                    if titles.empty:
+                        continue
+                    start_row = titles.index[0]
+
+                # Regla de corte: contar filas seguidas sin título
+                has_title = block.index.isin(titles.index)
+                stop_row = None
+                for row_idx, found in zip(block.index, has_title):
+                    if row_idx < start_row:
+                        continue
+                    empty_rows = 0 if found else empty_rows + 1
+                    if empty_rows == MAX_EMPTY_TITLE_ROWS:
+                        stop_row = row_idx - MAX_EMPTY_TITLE_ROWS + 1
+                        break
+
+                first = max(start_row, block.index[0])
+                last = block.index[-1] + 1 if stop_row is None else stop_row
+                if last > first:
+                    data_list.extend(self._process_dataframe(block.loc[first:last - 1], 0, config))
+                if stop_row is not None:
+                    break
+        finally:
+            rows.close()
+
+        return start_row, data_list
+
+    def _extract_sheet(self, session, sheet_idx, config):
+        """(start_row, data_list) de una hoja, en memoria o en streaming."""
+        if self.streaming and session.streaming:
+            return self._stream_dataframe(session, sheet_idx, config)
+        df = self._load_sheet(session, sheet_idx, *self._sheet_columns(config))
+        start_row = self._find_start_row(df, config['title_range'])
+        return start_row, self._process_dataframe(df, start_row, config)
+
+    def _cached_sheet(self, session, sheet_idx):
+        """Entrada del SheetCache para la hoja, o None (sin caché o no cacheada)."""
+        if self.cache is None:
+            return None
+        return self.cache.load(session.file_path, sheet_idx, self.year, self.month, self.streaming)
+
+    def _extract_sheet_cached(self, session, sheet_idx, config, sheet_name, cached):
+        """_extract_sheet, salvo que la hoja venga del caché; guarda lo extraído."""
+        if cached is not None:
+            return cached['start_row'], cached['data']
+        start_row, data_list = self._extract_sheet(session, sheet_idx, config)
+        if self.cache is not None:
+            self.cache.store(session.file_path, sheet_idx, self.year, self.month, self.streaming,
+                             sheet_name, config, start_row, data_list)
+        return start_row, data_list
+
+    def _build_match_index(self, items, key):
+        """
+        Índice clave -> cola (en orden de aparición) de los items aún sin
+        coincidencia. Reemplaza el recorrido completo de la lista de Salida
+        por cada item de Cliente.
+        """
+        index = defaultdict(deque)
+        for item in items:
+            if not item['matched']:
+                index[item[key]].append(item)
+        return index
+
+    def _pop_match(self, index, value):
+        """Primer item sin coincidencia con esa clave (cada uno se usa una sola vez)."""
+        pending = index.get(value)
+        if pending:
+            return pending.popleft()
+        return None
+
+    def _match_by_key(self, data_cliente, data_salida, key):
+        """
+        Empareja por `key` ('num' o 'text') los items de Cliente y Salida aún
+        sin coincidencia, los marca como 'matched' y devuelve los pares
+        (cliente, salida) en el orden de Cliente.
+        """
+        index = self._build_match_index(data_salida, key)
+        pares = []
+        for cliente_item in data_cliente:
+            if cliente_item['matched']: continue
+            found_match = self._pop_match(index, cliente_item[key])
+            if found_match:
+                cliente_item['matched'] = True
+                found_match['matched'] = True
+                pares.append((cliente_item, found_match))
+        return pares
+
+    def _match_fuzzy(self, data_cliente, data_salida):
+        """
+        6.B' (opcional). Coincidencia APROXIMADA de los títulos que siguen sin
+        par: similitud de Dice entre los trigramas de los textos normalizados
+        (_fuzzy_text), de 0 a 1, con umbral self.fuzzy_threshold.
+
+        Los candidatos salen de un índice invertido trigrama -> títulos de
+        Salida, no de comparar todos contra todos. Por el umbral, un candidato
+        válido comparte al menos `mínimo` trigramas con el título de Cliente,
+        así que alcanza con mirar los (total - mínimo + 1) trigramas menos
+        frecuentes (filtro por prefijo), y su cantidad de trigramas no puede
+        alejarse demasiado de la del título (filtro por longitud). Ninguno
+        de los dos filtros descarta un candidato válido. Los textos que solo
+        difieren en mayúsculas, acentos, puntuación o espacios (mismos
+        trigramas, similitud 1) se resuelven directo, sin buscar.
+
+        Recorre Cliente en orden y se queda con el título de Salida más
+        parecido (ante empate, el primero). Devuelve (pares, similitudes).
+        """
+        threshold = self.fuzzy_threshold
+        salida = [(item, _trigrams(_fuzzy_text(item['text']))) for item in data_salida if not item['matched']]
+        if not salida:
+            return [], []
+        sizes = [len(grams) for _, grams in salida]
+        index = defaultdict(list)
+        same_grams = defaultdict(deque)
+        for pos, (_, grams) in enumerate(salida):
+            same_grams[grams].append(pos)
+            for gram in grams:
+                index[gram].append(pos)
+
+        pares = []
+        similitudes = []
+        for cliente_item in data_cliente:
+            if cliente_item['matched']:
+                continue
+            grams = _trigrams(_fuzzy_text(cliente_item['text']))
+            same = same_grams.get(grams)
+            while same and salida[same[0]][0]['matched']:
+                same.popleft()
+            if same:
+                best = salida[same.popleft()][0]
+                cliente_item['matched'] = True
+                best['matched'] = True
+                pares.append((cliente_item, best))
+                similitudes.append(1.0)
+                continue
+            # Dice >= umbral implica compartir al menos umbral*n/(2-umbral) trigramas
+            min_shared = max(1, math.ceil(threshold * len(grams) / (2 - threshold) - 1e-9))
+            max_size = len(grams) * (2 - threshold) / threshold + 1e-9
+            rare = sorted(grams, key=lambda gram: len(index.get(gram, ())))[:len(grams) - min_shared + 1]
+            best, best_similarity = None, threshold
+            for pos in sorted({pos for gram in rare for pos in index.get(gram, ())}):
+                salida_item, salida_grams = salida[pos]
+                if salida_item['matched'] or not min_shared <= sizes[pos] <= max_size:
+                    continue
+                similarity = 2 * len(grams & salida_grams) / (len(grams) + len(salida_grams))
+                if similarity > best_similarity or (best is None and similarity >= threshold):
+                    best, best_similarity = salida_item, similarity
+            if best is not None:
+                cliente_item['matched'] = True
+                best['matched'] = True
+                pares.append((cliente_item, best))
+                similitudes.append(best_similarity)
+        return pares, similitudes
+
+    def _values_array(self, items, key):
+        """Valores `key` de una lista de items como array float64, con NaN (vacío) -> 0."""
+        values = np.array([item[key] for item in items], dtype=np.float64)
+        return np.nan_to_num(values, nan=0.0)
+
+    def _check_values_batch(self, context, titles, cliente_vals, salida_vals, period=None):
+        """
+        Lógica de comparación específica con reglas de 0 y multiplicador 1000,
+        usando el VALOR ABSOLUTO de enteros (INT), aplicada en bloque con NumPy
+        a todos los pares de un período.
+        Devuelve {posición: Finding} SOLO para los pares que no cumplen.
+        """
+        # 1. Tratar NaN (vacío) como 0 ANTES de cualquier cálculo
+        cliente_vals = np.nan_to_num(np.asarray(cliente_vals, dtype=np.float64), nan=0.0)
+        salida_vals = np.nan_to_num(np.asarray(salida_vals, dtype=np.float64), nan=0.0)
+
+        # 2. Escalar Salida (/1000) y redondear ambos al entero más cercano
+        #    (np.round redondea al par, igual que round()). 3. Valor absoluto.
+        abs_salida_scaled = np.abs(np.round(salida_vals / 1000.0))
+        abs_cliente_val = np.abs(np.round(cliente_vals))
+
+        # 4. Reglas de negocio (usando los valores absolutos)
+        # Regla: Si Cliente (abs) es 0, Salida (abs) debe ser 0.
+        cliente_cero = (abs_cliente_val == 0) & (abs_salida_scaled != 0)
+        # Regla: Si Cliente (abs) NO es 0, deben coincidir EXACTAMENTE.
+        discrepancia = (abs_cliente_val != 0) & (abs_cliente_val != abs_salida_scaled)
+
+        messages = {}
+        for pos in np.flatnonzero(cliente_cero | discrepancia).tolist():
+            messages[pos] = Finding('cliente_cero' if cliente_cero[pos] else 'discrepancia',
+                                    sheet=context, side='cliente', title=titles[pos], period=period,
+                                    cliente_value=int(abs_cliente_val[pos]),
+                                    salida_value=int(abs_salida_scaled[pos]))
+        return messages
+
+    def _check_matched_pairs(self, sheet_context, pairs, messages, text_match=False, similarities=None):
+        """
+        Valida Actual y Anterior de todos los pares (cliente, salida) en bloque
+        y agrega a `messages` en el mismo orden que el recorrido par a par.
+        Con `text_match` se antepone el AVISO de coincidencia por TEXTO; con
+        `similarities` (una por par), el de coincidencia APROXIMADA.
+        """
+        if not pairs:
+            return
+        titles = [cliente_item['full_title'] for cliente_item, _ in pairs]
+        actual_msgs = self._check_values_batch(
+            sheet_context, titles,
+            self._values_array([c for c, _ in pairs], 'actual'),
+            self._values_array([s for _, s in pairs], 'actual'), period='Actual')
+        anterior_msgs = self._check_values_batch(
+            sheet_context, titles,
+            self._values_array([c for c, _ in pairs], 'anterior'),
+            self._values_array([s for _, s in pairs], 'anterior'), period='Anterior')
+
+        positions = range(len(pairs)) if text_match or similarities is not None else sorted(actual_msgs.keys() | anterior_msgs.keys())
+        for pos in positions:
+            cliente_item, salida_item = pairs[pos]
+            if similarities is not None:
+                messages.append(Finding('coincidencia_aproximada', sheet=sheet_context, side='cliente',
+                                        row_num=cliente_item['row_num'], title=cliente_item['full_title'],
+                                        other_row_num=salida_item['row_num'], other_title=salida_item['full_title'],
+                                        similarity=round(similarities[pos], 4)))
+            elif text_match:
+                messages.append(Finding('coincidencia_texto', sheet=sheet_context, side='cliente',
+                                        row_num=cliente_item['row_num'], title=cliente_item['full_title'],
+                                        other_row_num=salida_item['row_num'], other_title=salida_item['full_title']))
+            for period_msgs in (actual_msgs, anterior_msgs):
+                if pos in period_msgs:
+                    finding = period_msgs[pos]
+                    finding.row_num = cliente_item['row_num']
+                    finding.other_row_num = salida_item['row_num']
+                    finding.other_title = salida_item['full_title']
+                    messages.append(finding)
+
+    def _report_missing_rows(self, sheet_context, data_cliente, messages):
+        """6.C en bloque: títulos de Cliente sin par, con algún valor distinto de 0."""
+        pending = [item for item in data_cliente if not item['matched']]
+        if not pending:
+            return
+        actual = self._values_array(pending, 'actual')
+        anterior = self._values_array(pending, 'anterior')
+        for pos in np.flatnonzero((actual != 0) | (anterior != 0)).tolist():
+            cliente_item = pending[pos]
+            cliente_actual = _excel_number(cliente_item['actual']) if pd.notna(cliente_item['actual']) else 0
+            cliente_anterior = _excel_number(cliente_item['anterior']) if pd.notna(cliente_item['anterior']) else 0
+            messages.append(Finding('falta', sheet=sheet_context, side='cliente',
+                                    row_num=cliente_item['row_num'], title=cliente_item['full_title'],
+                                    actual_value=cliente_actual, anterior_value=cliente_anterior))
+
+    def _report_extra_rows(self, sheet_context, data_salida, messages):
+        """6.D en bloque: títulos de Salida sin par, con algún valor escalado distinto de 0."""
+        pending = [item for item in data_salida if not item['matched']]
+        if not pending:
+            return
+        scaled_actual = np.abs(np.round(self._values_array(pending, 'actual') / 1000.0))
+        scaled_anterior = np.abs(np.round(self._values_array(pending, 'anterior') / 1000.0))
+        for pos in np.flatnonzero((scaled_actual != 0) | (scaled_anterior != 0)).tolist():
+            salida_item = pending[pos]
+            messages.append(Finding('sobra', sheet=sheet_context, side='salida',
+                                    row_num=salida_item['row_num'], title=salida_item['full_title'],
+                                    actual_value=int(scaled_actual[pos]),
+                                    anterior_value=int(scaled_anterior[pos])))
+
+    def _account_tree(self, items):
+        """
+        Árbol de cuentas de una hoja a partir de la numeración de los títulos
+        ('1.2.3' es subcuenta de '1.2'). Devuelve un array con, para cada
+        item, la posición de su cuenta madre: la más cercana que exista en la
+        hoja ('1.2.3' cuelga de '1' si no hay '1.2'), o -1 si no tiene. Una
+        numeración repetida no puede ser madre (no se sabe cuál de sus filas
+        es el subtotal): sus subcuentas quedan sin madre.
+
+        Se arma subiendo un nivel por vuelta para todas las cuentas que
+        siguen sin madre, con la búsqueda de numeraciones en bloque
+        (Index.get_indexer), no cuenta por cuenta.
+        """
+        parents = np.full(len(items), -1, dtype=np.int64)
+        nums = [item['num'] for item in items]
+        nums = [_DOTS_RE.sub('.', num).strip('.') if '..' in num else num.strip('.') for num in nums]
+
+        # numeración -> posición de su fila (-2 si está repetida)
+        index = pd.Index(nums, dtype=object)
+        first = ~index.duplicated()
+        lookup = index[first]
+        owners = np.where(index.duplicated(keep=False), -2, np.arange(len(nums)))[first]
+
+        pending = np.array([pos for pos, num in enumerate(nums) if '.' in num], dtype=np.int64)
+        prefixes = [nums[pos] for pos in pending]
+        while len(pending):
+            prefixes = [prefix.rpartition('.')[0] for prefix in prefixes]
+            found = lookup.get_indexer(prefixes)
+            hit = found >= 0
+            parents[pending[hit]] = owners[found[hit]]
+            # Las que no encontraron madre en este nivel prueban con el siguiente
+            keep = ~hit & np.array(['.' in prefix for prefix in prefixes], dtype=bool)
+            pending = pending[keep]
+            prefixes = [prefix for prefix, kept in zip(prefixes, keep) if kept]
+        parents[parents == -2] = -1
+        return parents
+
+    def _check_subtotals(self, sheet_context, side, items, parents, actual_vals, anterior_vals, messages):
+        """
+        Valida que cada cuenta con subcuentas (según `parents`, de
+        _account_tree) sea igual a la suma de sus subcuentas directas, en
+        Actual y en Anterior, en los valores del propio archivo. Las sumas
+        salen de un solo bincount por período (agrupadas por cuenta madre).
+
+        Como en _check_values_batch, el vacío cuenta como 0 y se compara cada
+        valor redondeado al entero, con su signo (una madre en -50 sobre una
+        hija en +50 es un error); una cuenta madre vacía es un encabezado sin
+        importe y no se valida. Agrega a `messages` un
+        Finding 'subtotal' por cuenta y período, en orden de fila.
+        """
+        children = parents >= 0
+        if not children.any():
+            return
+        count = len(items)
+        has_children = np.bincount(parents[children], minlength=count) > 0
+
+        period_msgs = []
+        for period, values in (('Actual', actual_vals), ('Anterior', anterior_vals)):
+            values = np.asarray(values, dtype=np.float64)
+            sums = np.bincount(parents[children], weights=np.nan_to_num(values[children], nan=0.0), minlength=count)
+            wrong = has_children & ~np.isnan(values) & (np.round(values) != np.round(sums))
+            period_msgs.append({pos: (period, values[pos], sums[pos]) for pos in np.flatnonzero(wrong).tolist()})
+
+        value_field = 'salida_value' if side == 'salida' else 'cliente_value'
+        for pos in sorted(period_msgs[0].keys() | period_msgs[1].keys()):
+            for msgs in period_msgs:
+                if pos in msgs:
+                    period, value, total = msgs[pos]
+                    messages.append(Finding('subtotal', sheet=sheet_context, side=side, row_num=items[pos]['row_num'],
+                                            title=items[pos]['full_title'], period=period,
+                                            children_value=int(np.round(total)),
+                                            **{value_field: int(np.round(value))}))
+
+    def _report_subtotals(self, sheet_context, data_cliente, data_salida, messages, timings):
+        """Validación de subtotales (opcional) de las dos hojas de un par ya extraídas."""
+        with self._stage(timings, 'subtotales', sheet_context) as timing:
+            for side, items in (('cliente', data_cliente), ('salida', data_salida)):
+                self._check_subtotals(sheet_context, side, items, self._account_tree(items),
+                                      [item['actual'] for item in items], [item['anterior'] for item in items],
+                                      messages)
+            timing.rows = len(data_cliente) + len(data_salida)
+
+    def _compare_sheet_pair(self, cliente_libro, salida_libro, cliente_sheet_idx, salida_sheet_idx):
+        """
+        Pipeline completo de UN par de hojas (detección, extracción,
+        coincidencias y validación). No depende de los otros pares: devuelve
+        (Finding, StageTiming) propios para que compare() los una en orden.
+        """
+        messages = []
+        timings = []
+        sheet = (cliente_sheet_idx, salida_sheet_idx)
+    
+        cliente_config = None
+        salida_config = None
+        sheet_context = f"(Hoja Cliente idx {cliente_sheet_idx+1} vs Hoja Salida idx {salida_sheet_idx+1})" 
+
+        self._check_cancelled()
+        self._notify('stage', stage='deteccion', sheet=sheet)
+        try:
+            # Con caché, una hoja ya extraída no necesita abrir su archivo
+            cliente_cached = self._cached_sheet(cliente_libro, cliente_sheet_idx)
+            salida_cached = self._cached_sheet(salida_libro, salida_sheet_idx)
+
+            cliente_sheet_name = cliente_cached['sheet_name'] if cliente_cached else cliente_libro.sheet_names[cliente_sheet_idx]
+            salida_sheet_name = salida_cached['sheet_name'] if salida_cached else salida_libro.sheet_names[salida_sheet_idx]
+            sheet_context = f"Hoja '{cliente_sheet_name}' vs Hoja '{salida_sheet_name}'"
+
+            messages.append(Finding('hoja', sheet=sheet_context))
+            cliente_config = cliente_cached['config'] if cliente_cached else \
+                self._timed_detection(timings, sheet_context, 'cliente', cliente_libro, cliente_sheet_idx)
+            messages.append(Finding('estado', sheet=sheet_context, side='cliente',
+                                    detail=f"  -> Cliente OK: Títulos en '{cliente_config['title_range']}', Actual en '{cliente_config['actual_col']}'"))
+
+            salida_config = salida_cached['config'] if salida_cached else \
+                self._timed_detection(timings, sheet_context, 'salida', salida_libro, salida_sheet_idx)
+            messages.append(Finding('estado', sheet=sheet_context, side='salida',
+                                    detail=f"  -> Salida OK: Títulos en '{salida_config['title_range']}', Actual en '{salida_config['actual_col']}'"))
+    
+        except Exception as e:
+            messages.append(Finding('error', sheet=sheet_context,
+                                    detail=f"ERROR: No se pudo procesar/detectar {sheet_context}. Detalle: {e}"))
+            return messages, timings
+
+        self._check_cancelled()
+        self._notify('stage', stage='extraccion', sheet=sheet)
+        with self._stage(timings, 'extraccion', sheet_context, 'cliente') as timing:
+            start_row_cliente, data_cliente = self._extract_sheet_cached(
+                cliente_libro, cliente_sheet_idx, cliente_config, cliente_sheet_name, cliente_cached)
+            timing.rows = len(data_cliente)
+        with self._stage(timings, 'extraccion', sheet_context, 'salida') as timing:
+            start_row_salida, data_salida = self._extract_sheet_cached(
+                salida_libro, salida_sheet_idx, salida_config, salida_sheet_name, salida_cached)
+            timing.rows = len(data_salida)
+    
+        if start_row_cliente is None:
+            messages.append(Finding('advertencia', sheet=sheet_context, side='cliente',
+                                    detail=f"ADVERTENCIA: No se encontraron títulos en {sheet_context} (Cliente)."))
+            return messages, timings
+        if start_row_salida is None:
+            messages.append(Finding('advertencia', sheet=sheet_context, side='salida',
+                                    detail=f"ADVERTENCIA: No se encontraron títulos en {sheet_context} (Salida)."))
+            return messages, timings
+
+        if not data_cliente:
+             messages.append(Finding('advertencia', sheet=sheet_context, side='cliente',
+                                     detail=f"ADVERTENCIA: No se extrajeron datos de Cliente en {sheet_context}."))
+             return messages, timings
+        if not data_salida:
+             messages.append(Finding('advertencia', sheet=sheet_context, side='salida',
+                                     detail=f"ADVERTENCIA: No se extrajeron datos de Salida en {sheet_context}."))
+             return messages, timings
+
+        self._check_cancelled()
+        self._notify('stage', stage='coincidencias', sheet=sheet)
+        self._pair_findings(sheet, sheet_context, data_cliente, data_salida, messages, timings)
+        if self.check_subtotals:
+            self._check_cancelled()
+            self._notify('stage', stage='subtotales', sheet=sheet)
+            self._report_subtotals(sheet_context, data_cliente, data_salida, messages, timings)
+        return messages, timings
+
+    def _pair_findings(self, sheet, sheet_context, data_cliente, data_salida, messages, timings):
+        """
+        Coincidencias (6.A / 6.B), validación de valores y faltantes/sobrantes
+        (6.C / 6.D) de un par de hojas ya extraídas; agrega a `messages`.
+        """
+        with self._stage(timings, 'coincidencias', sheet_context) as timing:
+            # 6.A. Lógica de Coincidencia por NÚMERO
+            pares_num = self._match_by_key(data_cliente, data_salida, 'num')
+            # 6.B. Lógica de Coincidencia por TEXTO
+            pares_texto = self._match_by_key(data_cliente, data_salida, 'text')
+            # 6.B'. Coincidencia APROXIMADA (opcional) de lo que sigue sin par
+            pares_aprox, similitudes = self._match_fuzzy(data_cliente, data_salida) \
+                if self.fuzzy_threshold else ([], [])
+            timing.rows = len(pares_num) + len(pares_texto) + len(pares_aprox)
+
+        # Validación de valores de los pares (número, texto y aproximados, en ese orden)
+        with self._stage(timings, 'validacion', sheet_context) as timing:
+            self._check_matched_pairs(sheet_context, pares_num, messages)
+            self._check_matched_pairs(sheet_context, pares_texto, messages, text_match=True)
+            self._check_matched_pairs(sheet_context, pares_aprox, messages, similarities=similitudes)
+            timing.rows = len(pares_num) + len(pares_texto) + len(pares_aprox)
+
+        self._check_cancelled()
+        self._notify('stage', stage='faltantes', sheet=sheet)
+
+        with self._stage(timings, 'faltantes', sheet_context) as timing:
+            # 6.C. Reportar FALTANTES en Salida
+            self._report_missing_rows(sheet_context, data_cliente, messages)
+
+            # 6.D. Reportar SOBRANTES en Salida
+            self._report_extra_rows(sheet_context, data_salida, messages)
+            timing.rows = sum(not item['matched'] for item in data_cliente) + \
+                sum(not item['matched'] for item in data_salida)
+
+    def _timed_detection(self, timings, sheet_context, side, session, sheet_idx):
+        """
+        Auto-detección de una hoja (sobre sus primeras filas) y, fuera de
+        streaming, lectura proyectada de las columnas detectadas; cada una
+        medida aparte.
+        """
+        with self._stage(timings, 'deteccion', sheet_context, side):
+            config = self._detect_columns(session, sheet_idx)
+        if not session.streaming:
+            with self._stage(timings, 'lectura', sheet_context, side) as timing:
+                timing.rows = len(self._load_sheet(session, sheet_idx, *self._sheet_columns(config)))
+        return config
+
+    def _compare_sheet_pairs(self, cliente_libro, salida_libro):
+        """
+        Procesa los pares de self.sheet_map (en serie o en paralelo según
+        self.parallel) y devuelve los Finding SIEMPRE en el orden de sheet_map.
+        Un error que no se informa como hallazgo se propaga igual en todos los
+        modos: el del primer par que falla, en el orden de sheet_map.
+        Los tiempos de cada par se agregan a self.profile en ese mismo orden.
+        """
+        total = len(self.sheet_map)
+        messages = []
+        if not self.parallel or total < 2:
+            for position, (cliente_sheet_idx, salida_sheet_idx) in enumerate(self.sheet_map):
+                self._check_cancelled()
+                self._notify('sheet', status='start', index=position, total=total, sheet=(cliente_sheet_idx, salida_sheet_idx))
+                pair_messages, pair_timings = self._compare_sheet_pair(cliente_libro, salida_libro, cliente_sheet_idx, salida_sheet_idx)
+                self._sheet_done(position, (cliente_sheet_idx, salida_sheet_idx), pair_messages)
+                messages.extend(pair_messages)
+                self.profile.extend(pair_timings)
+            return messages
+
+        if self.parallel == 'thread':
+            # Los hilos comparten las WorkbookSession ya abiertas
+            executor = ThreadPoolExecutor(max_workers=len(self.sheet_map))
+            job, job_args = self._compare_sheet_pair, (cliente_libro, salida_libro)
+        elif self.parallel == 'process':
+            # Cada proceso abre los archivos por su cuenta y parsea solo sus hojas
+            executor = ProcessPoolExecutor(max_workers=min(len(self.sheet_map), os.cpu_count() or 1))
+            job, job_args = _compare_sheet_pair_job, (self,)
+        else:
+            raise ValueError(f"Modo de paralelismo inválido: '{self.parallel}'. Use None, 'thread' o 'process'.")
+
+        aborted = False
+        try:
+            futures = []
+            for position, (cliente_sheet_idx, salida_sheet_idx) in enumerate(self.sheet_map):
+                self._notify('sheet', status='start', index=position, total=total, sheet=(cliente_sheet_idx, salida_sheet_idx))
+                futures.append(executor.submit(job, *job_args, cliente_sheet_idx, salida_sheet_idx))
+
+            for position, ((cliente_sheet_idx, salida_sheet_idx), future) in enumerate(zip(self.sheet_map, futures)):
+                pair_timings = []
+                try:
+                    pair_messages, pair_timings = self._wait_result(future)
+                except BaseException:
+                    # Como en serie: la cancelación o el primer error (en el orden
+                    # de sheet_map) corta la corrida y se propaga
+                    aborted = True
+                    raise
+                self._sheet_done(position, (cliente_sheet_idx, salida_sheet_idx), pair_messages)
+                messages.extend(pair_messages)
+                self.profile.extend(pair_timings)
+        finally:
+            # Al cortar se descartan los pares pendientes. Los hilos en curso se
+            # esperan: no siguen leyendo los libros ni informando eventos después
+            # de que compare() terminó. Un proceso no ve la cancelación (no recibe
+            # el Event): no se lo espera.
+            executor.shutdown(wait=not aborted or self.parallel == 'thread', cancel_futures=aborted)
+        return messages
+
+    def _wait_result(self, future):
+        """future.result(), atendiendo un pedido de cancelación mientras espera."""
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FuturesTimeoutError:
+                self._check_cancelled()
+
+    def _sheet_done(self, position, sheet, pair_messages):
+        findings = [finding for finding in pair_messages if not finding.is_status]
+        self._notify('sheet', status='done', index=position, total=len(self.sheet_map), sheet=sheet, findings=findings)
+
+    # --- MÉTODO compare ACTUALIZADO ---
+    def compare(self):
+        """
+        Método principal. La auto-detección ahora ocurre DENTRO del bucle.
+        """
+        self.result = ComparisonResult()
+        return self._profiled(self._compare)
+
+    def _profiled(self, run, *args):
+        """Ejecuta `run(*args)` con un ComparisonProfile nuevo (y tracemalloc si profile_memory)."""
+        self.profile = ComparisonProfile()
+        started = time.perf_counter()
+        start_tracing = self.profile_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        try:
+            return run(*args)
+        finally:
+            if start_tracing:
+                tracemalloc.stop()
+            self.profile.total_seconds = time.perf_counter() - started
+
+    def _compare(self):
+        """Cuerpo de compare(): abre los archivos, compara los pares y arma el reporte."""
+        self._notify('stage', stage='apertura', sheet=None)
+
+        # Cada archivo se abre y se parsea una sola vez por corrida.
+        cliente_libro = WorkbookSession(self.cliente_path, streaming=self.streaming)
+        salida_libro = WorkbookSession(self.salida_path, streaming=self.streaming)
+        try:
+            with self._stage(self.profile.stages, 'apertura', None):
+                if self.cache is None:
+                    cliente_libro.open()
+                    salida_libro.open()
+                else:
+                    # Con caché solo se verifica que se puedan leer; se abren si hace falta
+                    self.cache.file_hash(self.cliente_path)
+                    self.cache.file_hash(self.salida_path)
+        except Exception as e:
+            cliente_libro.close()
+            salida_libro.close()
+            self.result.append(Finding('error_critico',
+                                       detail=f"ERROR CRÍTICO: No se pudo abrir uno de los archivos Excel. Detalle: {e}"))
+            return self.result.findings[0].render()
+
+        try:
+            self.result.extend(self._compare_sheet_pairs(cliente_libro, salida_libro))
+        finally:
+            cliente_libro.close()
+            salida_libro.close()
+        self._notify('stage', stage='fin', sheet=None)
+
+        return self.result.render_text()
+
+    # --- COMPARACIÓN DE VARIOS PERÍODOS EN UNA PASADA ---
+    def compare_periods(self, periods=None):
+        """
+        Compara varios períodos en una sola pasada: cada hoja se lee, se
+        auto-detecta y se extrae UNA vez, y las coincidencias de títulos se
+        buscan una vez para todos los períodos; solo la validación de
+        valores y los faltantes/sobrantes se repiten por período.
+
+        `periods` es una lista de (año, mes). Con None se usan todos los
+        períodos detectados en las hojas de Cliente que tienen a su derecha
+        otra columna de período (su 'anterior').
+        Devuelve {(año, mes): reporte de texto}, en el orden de los
+        períodos; los ComparisonResult quedan en self.period_results.
+        Usa la lectura proyectada: no usa el caché ni el modo streaming.
+        """
+        self.result = ComparisonResult()
+        self.period_results = {}
+        return self._profiled(self._compare_periods, periods)
+
+    def _compare_periods(self, periods):
+        self._notify('stage', stage='apertura', sheet=None)
+
+        cliente_libro = WorkbookSession(self.cliente_path)
+        salida_libro = WorkbookSession(self.salida_path)
+        try:
+            with self._stage(self.profile.stages, 'apertura', None):
+                cliente_libro.open()
+                salida_libro.open()
+        except Exception as e:
+            cliente_libro.close()
+            salida_libro.close()
+            error = Finding('error_critico',
+                            detail=f"ERROR CRÍTICO: No se pudo abrir uno de los archivos Excel. Detalle: {e}")
+            periods = list(periods) if periods else [(self.year, self.month)]
+            self.period_results = {period: ComparisonResult([error]) for period in periods}
+            return {period: error.render() for period in periods}
+
+        try:
+            if periods is None:
+                periods = self._detected_periods(cliente_libro)
+            else:
+                periods = list(dict.fromkeys((int(year), int(month)) for year, month in periods))
+
+            messages = {period: [] for period in periods}
+            total = len(self.sheet_map)
+            for position, (cliente_sheet_idx, salida_sheet_idx) in enumerate(self.sheet_map):
+                sheet = (cliente_sheet_idx, salida_sheet_idx)
+                self._check_cancelled()
+                self._notify('sheet', status='start', index=position, total=total, sheet=sheet)
+                pair_messages, pair_timings = self._compare_sheet_pair_periods(
+                    cliente_libro, salida_libro, cliente_sheet_idx, salida_sheet_idx, periods)
+                findings = [finding for period in periods for finding in pair_messages[period] if not finding.is_status]
+                self._notify('sheet', status='done', index=position, total=total, sheet=sheet, findings=findings)
+                for period in periods:
+                    messages[period].extend(pair_messages[period])
+                self.profile.extend(pair_timings)
+        finally:
+            cliente_libro.close()
+            salida_libro.close()
+        self._notify('stage', stage='fin', sheet=None)
+
+        self.period_results = {period: ComparisonResult(messages[period]) for period in periods}
+        return {period: result.render_text() for period, result in self.period_results.items()}
+
+    def _detected_periods(self, cliente_libro):
+        """
+        Períodos de las hojas de Cliente de sheet_map que tienen otra columna
+        de período inmediatamente a su derecha, ordenados del más reciente al
+        más antiguo. Si no hay ninguno, el período configurado (year/month).
+        """
+        found = set()
+        for cliente_sheet_idx, _ in self.sheet_map:
+            try:
+                scan = self._scan_period_columns(self._load_head(cliente_libro, cliente_sheet_idx))
+            except Exception:
+                continue  # El error de la hoja se informa al compararla
+            period_cols = set(scan.values())
+            found.update(period for period, col_idx in scan.items() if col_idx + 1 in period_cols)
+        return sorted(found, reverse=True) or [(self.year, self.month)]
+
+    def _extract_period_items(self, df, title_range, period_cols):
+        """
+        Extrae los títulos de la hoja UNA vez y arma la lista base de items
+        (sin valores) más, por período, los valores Actual/Anterior de cada
+        item. `period_cols` es {período: (índice Actual, índice Anterior)}.
+        Devuelve (start_row, items_base, {período: (actual_vals, anterior_vals)}).
+        """
+        titles = self._extract_titles(df, self._parse_col_range(title_range))
+        if titles.empty:
+            return None, [], {}
+
+        items = [{'num': number, 'text': text, 'full_title': original_full_title,
+                  'matched': False, 'row_num': index + 1}
+                 for index, number, text, original_full_title in zip(
+                     titles.index, titles['num'], titles['text'], titles['full_title'])]
+
+        # Cada columna se convierte una sola vez aunque la usen dos períodos
+        converted = {}
+        values = {}
+        for period, col_indices in period_cols.items():
+            for col_idx in col_indices:
+                if col_idx not in converted:
+                    converted[col_idx] = self._to_numeric_column(df[col_idx].loc[titles.index])
+            values[period] = tuple(converted[col_idx] for col_idx in col_indices)
+        return titles.index[0], items, values
+
+    def _compare_sheet_pair_periods(self, cliente_libro, salida_libro, cliente_sheet_idx, salida_sheet_idx, periods):
+        """
+        _compare_sheet_pair para varios períodos a la vez. Los mensajes de
+        cada período son los mismos que daría compare() con ese year/month;
+        el error con el que compare() cortaría la corrida (ej: CONFIGURACIÓN
+        INVÁLIDA) queda como un único ERROR de esa hoja en ese período.
+        Devuelve ({período: [Finding]}, [StageTiming]).
+        """
+        messages = {period: [] for period in periods}
+        timings = []
+        sheet = (cliente_sheet_idx, salida_sheet_idx)
+        sheet_context = f"(Hoja Cliente idx {cliente_sheet_idx+1} vs Hoja Salida idx {salida_sheet_idx+1})"
+
+        def add(period_list, finding):
+            for period in period_list:
+                messages[period].append(finding)
+
+        def error(detail):
+            return Finding('error', sheet=sheet_context,
+                           detail=f"ERROR: No se pudo procesar/detectar {sheet_context}. Detalle: {detail}")
+
+        sides = (('cliente', cliente_libro, cliente_sheet_idx), ('salida', salida_libro, salida_sheet_idx))
+
+        self._check_cancelled()
+        self._notify('stage', stage='deteccion', sheet=sheet)
+        detection = {}
+        try:
+            cliente_sheet_name = cliente_libro.sheet_names[cliente_sheet_idx]
+            salida_sheet_name = salida_libro.sheet_names[salida_sheet_idx]
+            sheet_context = f"Hoja '{cliente_sheet_name}' vs Hoja '{salida_sheet_name}'"
+            add(periods, Finding('hoja', sheet=sheet_context))
+
+            # Auto-detección UNA vez por hoja: todos los períodos y el rango de títulos
+            for side, session, sheet_idx in sides:
+                with self._stage(timings, 'deteccion', sheet_context, side):
+                    head = self._load_head(session, sheet_idx)
+                    scan = self._scan_period_columns(head)
+                    try:
+                        title_range = self._detect_title_range(head, session.file_path, sheet_idx)
+                    except ValueError as e:
+                        title_range = e
+                detection[side] = (scan, title_range)
+        except Exception as e:
+            # Falla de lectura: afecta a todos los períodos por igual
+            add(periods, error(e))
+            return messages, timings
+
+        # Configuración de cada período, con los mismos errores (y en el mismo orden) que _detect_columns
+        configs = {}
+        for period in periods:
+            year, month = period
+            config = {}
+            for side, session, sheet_idx in sides:
+                scan, title_range = detection[side]
+                if period not in scan:
+                    messages[period].append(error(self._period_not_found_error(session.file_path, sheet_idx, year, month)))
+                    break
+                if isinstance(title_range, Exception):
+                    messages[period].append(error(title_range))
+                    break
+                config[side] = {'title_range': title_range,
+                                'actual_col': self._int_to_col(scan[period]),
+                                'anterior_col': self._int_to_col(scan[period] + 1)}
+                label = 'Cliente' if side == 'cliente' else 'Salida'
+                messages[period].append(Finding('estado', sheet=sheet_context, side=side,
+                                                detail=f"  -> {label} OK: Títulos en '{title_range}', Actual en '{config[side]['actual_col']}'"))
+            else:
+                configs[period] = config
+        if not configs:
+            return messages, timings
+
+        self._check_cancelled()
+        self._notify('stage', stage='extraccion', sheet=sheet)
+        frames, all_cols = {}, {}
+        for side, session, sheet_idx in sides:
+            title_range = next(iter(configs.values()))[side]['title_range']
+            all_cols[side] = {period: self._sheet_columns(config[side])[1] for period, config in configs.items()}
+            try:
+                # Lectura proyectada UNA vez por hoja: títulos y las columnas de todos los períodos
+                with self._stage(timings, 'lectura', sheet_context, side) as timing:
+                    frames[side] = self._load_sheet(session, sheet_idx, self._parse_col_range(title_range),
+                                                    sorted({col_idx for cols in all_cols[side].values() for col_idx in cols}))
+                    timing.rows = len(frames[side])
+            except Exception as e:
+                add(configs, error(e))
+                return messages, timings
+        period_cols = {side: {} for side, _, _ in sides}
+        for period, config in configs.items():
+            # Un solo error por período: el del primer lado con columnas fuera de
+            # la hoja, el mismo con el que compare() corta ese período
+            for side, _, _ in sides:
+                df = frames[side]
+                col_indices = tuple(all_cols[side][period])
+                if any(col_idx not in df.columns for col_idx in col_indices):
+                    messages[period].append(error(
+                        f"CONFIGURACIÓN INVÁLIDA: Las columnas de período (Actual: {config[side]['actual_col']}, Anterior: {config[side]['anterior_col']}) están fuera de los límites. El archivo solo tiene {df.attrs.get('num_cols', len(df.columns))} columnas."))
+                    break
+                period_cols[side][period] = col_indices
+        extracted = {}
+        for side, _, _ in sides:
+            title_range = next(iter(configs.values()))[side]['title_range']
+            with self._stage(timings, 'extraccion', sheet_context, side) as timing:
+                extracted[side] = self._extract_period_items(frames[side], title_range, period_cols[side])
+                timing.rows = len(extracted[side][1])
+        valid = [period for period in configs
+                 if period in extracted['cliente'][2] and period in extracted['salida'][2]]
+
+        start_row_cliente, data_cliente, values_cliente = extracted['cliente']
+        start_row_salida, data_salida, values_salida = extracted['salida']
+        if start_row_cliente is None:
+            add(configs, Finding('advertencia', sheet=sheet_context, side='cliente',
+                                 detail=f"ADVERTENCIA: No se encontraron títulos en {sheet_context} (Cliente)."))
+            return messages, timings
+        if start_row_salida is None:
+            add(configs, Finding('advertencia', sheet=sheet_context, side='salida',
+                                 detail=f"ADVERTENCIA: No se encontraron títulos en {sheet_context} (Salida)."))
+            return messages, timings
+
+        self._check_cancelled()
+        self._notify('stage', stage='coincidencias', sheet=sheet)
+
+        # 6.A / 6.B: las coincidencias no dependen del período, se buscan una sola vez
+        with self._stage(timings, 'coincidencias', sheet_context) as timing:
+            pares_num = self._match_by_key(data_cliente, data_salida, 'num')
+            pares_texto = self._match_by_key(data_cliente, data_salida, 'text')
+            pares_aprox, similitudes = self._match_fuzzy(data_cliente, data_salida) \
+                if self.fuzzy_threshold else ([], [])
+            timing.rows = len(pares_num) + len(pares_texto) + len(pares_aprox)
+        cliente_pos = {id(item): pos for pos, item in enumerate(data_cliente)}
+        salida_pos = {id(item): pos for pos, item in enumerate(data_salida)}
+        pares_num = [(cliente_pos[id(c)], salida_pos[id(s)]) for c, s in pares_num]
+        pares_texto = [(cliente_pos[id(c)], salida_pos[id(s)]) for c, s in pares_texto]
+        pares_aprox = [(cliente_pos[id(c)], salida_pos[id(s)]) for c, s in pares_aprox]
+
+        with self._stage(timings, 'validacion', sheet_context) as timing:
+            timing.rows = 0
+            for period in valid:
+                period_cliente = [dict(item, actual=actual, anterior=anterior) for item, actual, anterior
+                                  in zip(data_cliente, *values_cliente[period])]
+                period_salida = [dict(item, actual=actual, anterior=anterior) for item, actual, anterior
+                                 in zip(data_salida, *values_salida[period])]
+                self._check_matched_pairs(sheet_context, [(period_cliente[c], period_salida[s]) for c, s in pares_num],
+                                          messages[period])
+                self._check_matched_pairs(sheet_context, [(period_cliente[c], period_salida[s]) for c, s in pares_texto],
+                                          messages[period], text_match=True)
+                self._check_matched_pairs(sheet_context, [(period_cliente[c], period_salida[s]) for c, s in pares_aprox],
+                                          messages[period], similarities=similitudes)
+                # 6.C / 6.D con los valores del período
+                self._report_missing_rows(sheet_context, period_cliente, messages[period])
+                self._report_extra_rows(sheet_context, period_salida, messages[period])
+                timing.rows += len(pares_num) + len(pares_texto) + len(pares_aprox)
+
+        if self.check_subtotals:
+            self._check_cancelled()
+            self._notify('stage', stage='subtotales', sheet=sheet)
+            # El árbol de cuentas de cada hoja se arma una vez para todos los períodos
+            with self._stage(timings, 'subtotales', sheet_context) as timing:
+                trees = {'cliente': self._account_tree(data_cliente), 'salida': self._account_tree(data_salida)}
+                for period in valid:
+                    for side, items, values in (('cliente', data_cliente, values_cliente),
+                                                ('salida', data_salida, values_salida)):
+                        self._check_subtotals(sheet_context, side, items, trees[side], *values[period],
+                                              messages[period])
+                timing.rows = len(data_cliente) + len(data_salida)
+
+        return messages, timings
+
+
+class IncrementalComparator(ExcelComparator):
+    """
+    Re-comparación incremental de UN par cliente/salida, para volver a
+    comparar cada vez que se guarda uno de los archivos (ver watch()).
+
+    Entre una corrida y la siguiente conserva:
+      - Las hojas extraídas (MemorySheetCache): un archivo sin cambios no
+        se vuelve a leer.
+      - Por par de hojas, el resultado de cada grupo de cuentas. Un grupo
+        junta las cuentas que comparten número o texto de título (las únicas
+        que pueden competir por una misma coincidencia) y se identifica por
+        la huella (hash del título y los valores) de cada una de sus
+        cuentas, en orden. Solo se vuelven a buscar coincidencias y a validar
+        los grupos con alguna cuenta nueva, modificada, borrada o movida.
+
+    El reporte es el mismo que el de ExcelComparator.compare(). Después de
+    cada compare(), self.diff (FindingsDiff) tiene los hallazgos nuevos,
+    resueltos y sin cambios respecto de la corrida anterior (en la primera,
+    todos son nuevos), y self.recomputed la cantidad de cuentas que se
+    volvieron a procesar.
     """
-    
-    # --- MÉTODO __init__ ACTUALIZADO ---
-    # Ya no necesita self.cliente_config ni self.salida_config
-    def __init__(self, cliente_path, salida_path, year, month):
-        self.cliente_path = cliente_path
-        self.salida_path = salida_path
-        self.year = year
-        self.month = month
-        self.inconsistencias = []
 
-        # Mapeo de hojas (basado en índice 0-based de pandas)
-        self.sheet_map = [(2, 1), (3, 2), (4, 3)]
+    def __init__(self, cliente_path, salida_path, year, month, streaming=False, progress_callback=None,
+                 profile_memory=False, fuzzy_threshold=None, check_subtotals=False):
+        # En serie: el estado de los grupos vive en este proceso
+        super().__init__(cliente_path, salida_path, year, month, parallel=None, streaming=streaming,
+                         cache=MemorySheetCache(), progress_callback=progress_callback,
+                         profile_memory=profile_memory, fuzzy_threshold=fuzzy_threshold,
+                         check_subtotals=check_subtotals)
+        self._groups = {}
+        self.previous = None
+        self.diff = None
+        self.recomputed = 0
+        self.runs = 0
 
-    # --- (Las siguientes funciones auxiliares NO CAMBIAN) ---
+    def compare(self):
+        self.recomputed = 0
+        self.runs += 1
+        report = super().compare()
+        self.diff = self.result.diff(self.previous)
+        self.previous = self.result
+        return report
 
-    def _col_to_int(self, col_str):
-        num = 0
-        for c in col_str:
-            num = num * 26 + (ord(c.upper()) - ord('A')) + 1
-        return num - 1
+    def _item_keys(self, items):
+        """
+        Clave de cada cuenta: (huella de título y valores, n° de aparición
+        de esa huella), para distinguir cuentas repetidas. El número de fila
+        no entra en la huella: insertar filas no invalida las cuentas.
+        """
+        seen = defaultdict(int)
+        keys = []
+        for item in items:
+            # NaN != NaN: las celdas vacías entran como 0, igual que en la validación
+            actual = item['actual'] if item['actual'] == item['actual'] else 0.0
+            anterior = item['anterior'] if item['anterior'] == item['anterior'] else 0.0
+            fingerprint = hash((item['num'], item['text'], item['full_title'], actual, anterior))
+            keys.append((fingerprint, seen[fingerprint]))
+            seen[fingerprint] += 1
+        return keys
 
-    def _int_to_col(self, n):
-        string = ""
-        n_copy = n
-        while n_copy >= 0:
-            string = chr(n_copy % 26 + ord('A')) + string
-            n_copy = n_copy // 26 - 1
-        return string
+    def _account_groups(self, data_cliente, data_salida):
+        """
+        Componentes conexos de las cuentas de ambos lados unidas por número y
+        por texto de título: [(posiciones Cliente, posiciones Salida)].
+        Las coincidencias de un grupo no dependen de las cuentas de otro.
+        """
+        parent = {}
 
-    def _parse_col_range(self, range_str):
-        try:
-            start_col, end_col = range_str.split(':')
-            start_idx = self._col_to_int(start_col)
-            end_idx = self._col_to_int(end_col)
-            return list(range(start_idx, end_idx + 1))
-        except Exception:
-            raise ValueError(f"Formato de rango de título inválido: '{range_str}'. Use 'A:F'.")
+        def find(node):
+            root = node
+            while parent[root] != root:
+                root = parent[root]
+            while parent[node] != root:
+                parent[node], node = root, parent[node]
+            return root
 
-    def _normalize_title(self, title):
-        if not isinstance(title, str):
-            return None
-        title = title.strip()
-        match = re.search(r'^\s*([\d\.]+)\s+(.*)', title)
-        if match:
-            return (match.group(1).strip(), match.group(2).strip().lower())
-        return None
+        for item in data_cliente + data_salida:
+            num_node, text_node = ('num', item['num']), ('text', item['text'])
+            parent.setdefault(num_node, num_node)
+            parent.setdefault(text_node, text_node)
+            num_root, text_root = find(num_node), find(text_node)
+            if num_root != text_root:
+                parent[text_root] = num_root
 
-    def _find_start_row(self, df, col_range_str):
-        col_indices = self._parse_col_range(col_range_str)
-        num_cols = len(df.columns) 
-        for index, row in df.iterrows():
-            for col_idx in col_indices:
-                if col_idx >= num_cols:
-                    continue 
-                cell_value = row.iloc[col_idx]
-                if self._normalize_title(cell_value) is not None:
-                    return index
-        return None
+        groups = {}
+        for side, items in enumerate((data_cliente, data_salida)):
+            for pos, item in enumerate(items):
+                groups.setdefault(find(('num', item['num'])), ([], []))[side].append(pos)
+        return list(groups.values())
 
-    def _detect_columns(self, file_path, sheet_idx):
+    def _pair_findings(self, sheet, sheet_context, data_cliente, data_salida, messages, timings):
         """
-        Auto-detecta el rango de títulos y las columnas de período 
-        para un archivo y hoja específicos (usa las primeras 50 filas).
-        Ahora maneja rangos de fechas (ej: 'YYYY-MM-DD - YYYY-MM-DD').
+        Igual que ExcelComparator._pair_findings, pero reutiliza el resultado
+        de los grupos de cuentas sin cambios desde la corrida anterior.
+        La coincidencia aproximada cruza los grupos: con fuzzy_threshold se
+        recalcula el par de hojas completo (solo se ahorra la lectura).
+        """
+        if self.fuzzy_threshold:
+            return super()._pair_findings(sheet, sheet_context, data_cliente, data_salida, messages, timings)
+        previous_groups = self._groups.get((sheet, sheet_context), {})
+        groups = {}
+        fresh = []
+        with self._stage(timings, 'coincidencias', sheet_context) as timing:
+            cliente_keys = self._item_keys(data_cliente)
+            salida_keys = self._item_keys(data_salida)
+            placed = []
+            for cliente_pos, salida_pos in self._account_groups(data_cliente, data_salida):
+                signature = (tuple(cliente_keys[pos] for pos in cliente_pos),
+                             tuple(salida_keys[pos] for pos in salida_pos))
+                result = previous_groups.get(signature)
+                if result is None:
+                    result = {'num': [], 'text': [], 'missing': [], 'extra': []}
+                    fresh.append((cliente_pos, salida_pos, result))
+                groups[signature] = result
+                placed.append((cliente_pos, salida_pos, result))
+
+            # 6.A / 6.B solo en los grupos nuevos o modificados
+            pairs = {'num': [], 'text': []}
+            for cliente_pos, salida_pos, result in fresh:
+                group_cliente = [data_cliente[pos] for pos in cliente_pos]
+                group_salida = [data_salida[pos] for pos in salida_pos]
+                for key in ('num', 'text'):
+                    for cliente_item, salida_item in self._match_by_key(group_cliente, group_salida, key):
+                        pairs[key].append((cliente_item, salida_item))
+            timing.rows = len(pairs['num']) + len(pairs['text'])
+            self.recomputed += sum(len(cliente_pos) + len(salida_pos) for cliente_pos, salida_pos, _ in fresh)
+
+        # Posición de cada cuenta dentro de su grupo, por número de fila (único por hoja)
+        cliente_slot = {}
+        salida_slot = {}
+        for cliente_pos, salida_pos, result in fresh:
+            for local, pos in enumerate(cliente_pos):
+                cliente_slot[data_cliente[pos]['row_num']] = (result, local)
+            for local, pos in enumerate(salida_pos):
+                salida_slot[data_salida[pos]['row_num']] = (result, local)
+
+        with self._stage(timings, 'validacion', sheet_context) as timing:
+            for key in ('num', 'text'):
+                pair_messages = []
+                self._check_matched_pairs(sheet_context, pairs[key], pair_messages, text_match=key == 'text')
+                by_row = defaultdict(list)
+                for finding in pair_messages:
+                    by_row[finding.row_num].append(finding)
+                for cliente_item, salida_item in pairs[key]:
+                    result, local = cliente_slot[cliente_item['row_num']]
+                    result[key].append((local, salida_slot[salida_item['row_num']][1],
+                                        by_row.get(cliente_item['row_num'], [])))
+            timing.rows = len(pairs['num']) + len(pairs['text'])
+
+        with self._stage(timings, 'faltantes', sheet_context) as timing:
+            missing = []
+            extra = []
+            self._report_missing_rows(sheet_context, [data_cliente[pos] for cliente_pos, _, _ in fresh
+                                                      for pos in cliente_pos], missing)
+            self._report_extra_rows(sheet_context, [data_salida[pos] for _, salida_pos, _ in fresh
+                                                    for pos in salida_pos], extra)
+            for finding in missing:
+                result, local = cliente_slot[finding.row_num]
+                result['missing'].append((local, finding))
+            for finding in extra:
+                result, local = salida_slot[finding.row_num]
+                result['extra'].append((local, finding))
+            timing.rows = len(missing) + len(extra)
+
+        self._groups[(sheet, sheet_context)] = groups
+        messages.extend(self._placed_findings(placed, data_cliente, data_salida))
+
+    def _placed_findings(self, placed, data_cliente, data_salida):
         """
+        Hallazgos de todos los grupos en el orden del reporte completo (pares
+        por número, pares por texto, faltantes y sobrantes, cada uno en orden
+        de fila), con los números de fila de esta corrida.
+        """
+        entries = {'num': [], 'text': [], 'missing': [], 'extra': []}
+        for cliente_pos, salida_pos, result in placed:
+            for key in ('num', 'text'):
+                entries[key].extend((cliente_pos[local], salida_pos[other], findings)
+                                    for local, other, findings in result[key])
+            entries['missing'].extend((cliente_pos[local], finding) for local, finding in result['missing'])
+            entries['extra'].extend((salida_pos[local], finding) for local, finding in result['extra'])
+
+        for key in ('num', 'text'):
+            for cliente_pos, salida_pos, findings in sorted(entries[key], key=itemgetter(0)):
+                row_num, other_row_num = data_cliente[cliente_pos]['row_num'], data_salida[salida_pos]['row_num']
+                for finding in findings:
+                    if (finding.row_num, finding.other_row_num) != (row_num, other_row_num):
+                        finding = finding.copy(row_num=row_num, other_row_num=other_row_num)
+                    yield finding
+        for key, items in (('missing', data_cliente), ('extra', data_salida)):
+            for pos, finding in sorted(entries[key], key=itemgetter(0)):
+                row_num = items[pos]['row_num']
+                yield finding if finding.row_num == row_num else finding.copy(row_num=row_num)
+
+
+def _files_signature(paths):
+    """(fecha de modificación, tamaño) de cada archivo; None si no existe (Excel lo reemplaza al guardar)."""
+    signature = []
+    for path in paths:
         try:
-            df = pd.read_excel(file_path, sheet_name=sheet_idx, header=None, nrows=120)
-        except Exception as e:
-            raise ValueError(f"No se pudo leer la hoja {sheet_idx+1} de {os.path.basename(file_path)}. Detalle: {e}")
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
 
-        # --- 1. Detección de Columna de Período (Columnas D hasta L) ---
-        periodo_search_cols = list(range(3, 12)) # D(3) a L(11)
-        actual_col = None
-        anterior_col = None
 
-        for col_idx in periodo_search_cols:
-            if col_idx >= len(df.columns):
-                continue
-            for row_idx in range(df.shape[0]):
-                cell_value = df.iloc[row_idx, col_idx]
-                try:
-                    # --- ¡AQUÍ ESTÁ LA MODIFICACIÓN! ---
-                    
-                    # 1. Convertir a string y dividir por " - " (espacio-guion-espacio)
-                    #    Tomamos el último elemento (-1) por si es un rango.
-                    #    .strip() elimina espacios en blanco al inicio/final.
-                    date_string_to_check = str(cell_value).split(' - ')[-1].strip()
-                    
-                    # 2. Analizar solo la cadena resultante (la fecha de fin)
-                    date = date_parse(date_string_to_check, dayfirst=True)
-                    
-                    # --- FIN DE LA MODIFICACIÓN ---
-                    
-                    if date.year == self.year and date.month == self.month:
-                        actual_col = self._int_to_col(col_idx)
-                        anterior_col = self._int_to_col(col_idx + 1)
-                        break 
-                except (ParserError, TypeError, OverflowError, ValueError):
-                    # Ignora celdas que no son fechas
-                    continue
-            if actual_col:
-                break
+def _print_watch_run(comparator, report, seconds):
+    """on_change por defecto de watch(): el reporte completo la primera vez, después solo los cambios."""
+    print(report if comparator.runs == 1 else comparator.diff.render_text())
+    print(f"[{time.strftime('%H:%M:%S')}] Comparación en {seconds:.2f} s "
+          f"({comparator.recomputed} cuentas recalculadas). Esperando cambios...\n", flush=True)
 
-        if not actual_col:
-            raise ValueError(f"AUTO-DETECCIÓN FALLIDA (Período):\nNo se pudo encontrar una columna de fecha con {self.month:02d}/{self.year} en '{os.path.basename(file_path)}' (Hoja {sheet_idx+1}, Cols D-L).")
 
-        # --- 2. Detección de Rango de Títulos (Columnas A hasta F) ---
-        # (Esta parte no cambia)
-        title_search_cols = list(range(0, 6)) # A(0) a F(5)
-        found_title_cols = [] 
+def watch(cliente_path, salida_path, year, month, interval=1.0, on_change=None, streaming=False, stop_event=None,
+          fuzzy_threshold=None, check_subtotals=False):
+    """
+    Modo vigilancia: compara el par y vuelve a comparar (en forma
+    incremental, con IncrementalComparator) cada vez que se guarda alguno
+    de los dos archivos. Un cambio se procesa cuando la fecha y el tamaño
+    del archivo se mantienen durante `interval` segundos (Excel escribe el
+    archivo en varios pasos).
 
-        for col_idx in title_search_cols:
-            if col_idx >= len(df.columns):
+    `on_change(comparator, reporte, segundos)` recibe cada corrida; el
+    comparador trae el FindingsDiff contra la anterior en comparator.diff.
+    Termina con Ctrl+C o al activar `stop_event` (threading.Event).
+    """
+    comparator = IncrementalComparator(cliente_path, salida_path, year, month, streaming=streaming,
+                                       fuzzy_threshold=fuzzy_threshold, check_subtotals=check_subtotals)
+    on_change = on_change or _print_watch_run
+    stop_event = stop_event or threading.Event()
+    paths = (cliente_path, salida_path)
+
+    compared = None
+    pending = _files_signature(paths)
+    while not stop_event.is_set():
+        current = _files_signature(paths)
+        if current != compared and current == pending and None not in current:
+            started = time.perf_counter()
+            report = comparator.compare()
+            on_change(comparator, report, time.perf_counter() - started)
+            compared = current
+        pending = current
+        stop_event.wait(interval)
+    return comparator
+
+
+def format_period_reports(reports):
+    """Une los reportes de compare_periods() en un solo texto, un bloque por período."""
+    return "\n\n".join(f"=== PERÍODO {month:02d}/{year} ===\n{report}" for (year, month), report in reports.items())
+
+
+def _compare_sheet_pair_job(comparator, cliente_sheet_idx, salida_sheet_idx):
+    """Un par de hojas en un proceso aparte (ExcelComparator con parallel='process')."""
+    start_tracing = comparator.profile_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    try:
+        with WorkbookSession(comparator.cliente_path, streaming=comparator.streaming) as cliente_libro, \
+                WorkbookSession(comparator.salida_path, streaming=comparator.streaming) as salida_libro:
+            return comparator._compare_sheet_pair(cliente_libro, salida_libro, cliente_sheet_idx, salida_sheet_idx)
+    finally:
+        if start_tracing:
+            tracemalloc.stop()
+
+
+# --- MODO BATCH (sin GUI) ---
+# Patrón de nombres para emparejar archivos en un directorio:
+# '<entidad>_cliente.xlsx' con '<entidad>_salida.xlsx' (también '-' o ' ').
+_BATCH_FILE_RE = re.compile(r'^(?P<nombre>.+?)[ _-]+(?P<rol>cliente|salida)\.xlsx?$', re.IGNORECASE)
+
+# Caché de hojas de cada proceso del servicio (_init_service_worker); None en batch
+_WORKER_CACHE = None
+
+
+def _discover_pairs(source):
+    """
+    Devuelve la lista de pares [{'nombre', 'cliente', 'salida'}] a comparar.
+    `source` puede ser:
+      - Un manifiesto CSV con columnas 'cliente' y 'salida' (y opcional
+        'nombre'). Las rutas relativas se resuelven desde el manifiesto.
+      - Un directorio con archivos '<entidad>_cliente.xlsx' / '<entidad>_salida.xlsx'.
+    """
+    if os.path.isdir(source):
+        found = defaultdict(dict)
+        for file_name in sorted(os.listdir(source)):
+            match = _BATCH_FILE_RE.match(file_name)
+            if match:
+                found[match.group('nombre')][match.group('rol').lower()] = os.path.join(source, file_name)
+        pairs = []
+        for nombre, roles in sorted(found.items()):
+            if 'cliente' not in roles or 'salida' not in roles:
+                print(f"Advertencia: '{nombre}' no tiene par cliente/salida completo en {source}. Se omite.")
                 continue
-            for row_idx in range(df.shape[0]):
-                cell_value = df.iloc[row_idx, col_idx]
-                if self._normalize_title(cell_value) is not None:
-                    found_title_cols.append(col_idx)
-                    break 
+            pairs.append({'nombre': nombre, 'cliente': roles['cliente'], 'salida': roles['salida']})
+        return pairs
 
-        if not found_title_cols:
-            raise ValueError(f"AUTO-DETECCIÓN FALLIDA (Títulos):\nNo se pudo encontrar ninguna columna con Títulos en '{os.path.basename(file_path)}' (Hoja {sheet_idx+1}, Cols A-F).")
+    base_dir = os.path.dirname(os.path.abspath(source))
+    pairs = []
+    with open(source, newline='', encoding='utf-8-sig') as manifest:
+        reader = csv.DictReader(manifest)
+        if not reader.fieldnames or not {'cliente', 'salida'} <= set(reader.fieldnames):
+            raise ValueError(f"El manifiesto '{source}' debe tener las columnas 'cliente' y 'salida'.")
+        for line_num, row in enumerate(reader, start=2):
+            cliente = os.path.join(base_dir, row['cliente'].strip())
+            salida = os.path.join(base_dir, row['salida'].strip())
+            nombre = (row.get('nombre') or '').strip() or f"par_{line_num - 1:04d}"
+            pairs.append({'nombre': nombre, 'cliente': cliente, 'salida': salida})
+    return pairs
 
-        min_col = min(found_title_cols)
-        max_col = max(found_title_cols)
-        title_range = f"{self._int_to_col(min_col)}:{self._int_to_col(max_col)}"
 
-        # --- 3. Retornar Configuración ---
-        return {
-            'title_range': title_range,
-            'actual_col': actual_col,
-            'anterior_col': anterior_col
-        }
+def _run_batch_job(job):
+    """
+    Compara UN par cliente/salida (se ejecuta en un proceso del pool).
+    Devuelve un resultado por período: uno solo, salvo que el trabajo pida
+    varios ('periods' o 'all_periods'), que se comparan en una pasada.
+    Nunca lanza excepciones: los errores quedan en el resultado.
+    """
+    started = time.perf_counter()
+    base = {'nombre': job['nombre'], 'cliente': job['cliente'], 'salida': job['salida']}
+    multi_period = job.get('all_periods') or job.get('periods') is not None
+    results = []
+    # En los procesos del servicio se usa el caché del proceso, que vive entre pedidos
+    cache = _WORKER_CACHE
+    if cache is None and job.get('cache_dir'):
+        cache = SheetCache(job['cache_dir'], job['cache_max_bytes'])
+    hits = cache.hits if cache is not None else 0
+    try:
+        comparator = ExcelComparator(job['cliente'], job['salida'], job['year'], job['month'],
+                                     streaming=job.get('streaming', False), cache=cache,
+                                     profile_memory=job.get('profile_memory', False),
+                                     fuzzy_threshold=job.get('fuzzy_threshold'),
+                                     check_subtotals=job.get('check_subtotals', False))
+        if multi_period:
+            reports = comparator.compare_periods(None if job.get('all_periods') else job['periods'])
+            period_results = comparator.period_results
+        else:
+            reports = {(job['year'], job['month']): comparator.compare()}
+            period_results = {(job['year'], job['month']): comparator.result}
 
-    def _process_dataframe(self, df, start_row, config):
-        """
-        Extrae los datos relevantes (título, actual, anterior) del DataFrame
-        y los devuelve en una LISTA de diccionarios.
-        
-        NUEVA REGLA: Deja de procesar si encuentra 4 filas consecutivas 
-        sin un título válido.
-        """
-        data_list = []
-        if start_row is None:
-            return data_list
+        for (year, month), report in reports.items():
+            period_result = period_results[(year, month)]
+            if job.get('profile'):
+                report += "\n\n" + comparator.profile.summary()
+            issues = period_result.issues()
+            if period_result.has_errors:
+                estado = 'ERROR'
+            elif issues:
+                estado = 'INCONSISTENCIAS'
+            else:
+                estado = 'OK'
+            # Registros planos: viajan al proceso principal sin re-parsear el reporte.
+            # El perfil es de la corrida completa: va solo con el primer período.
+            results.append(dict(base, periodo=f"{year}-{month:02d}", estado=estado, inconsistencias=len(issues),
+                                reporte=report, hallazgos=period_result.to_records(),
+                                perfil=[] if results else comparator.profile.to_records()))
+    except Exception as e:
+        results = [dict(base, periodo='' if multi_period else f"{job['year']}-{job['month']:02d}",
+                        estado='ERROR', inconsistencias=0, hallazgos=[], perfil=[],
+                        reporte=f"--- ERROR INESPERADO ---\n\n{type(e).__name__}: {e}")]
+    seconds = round(time.perf_counter() - started, 3)
+    cached_sheets = cache.hits - hits if cache is not None else 0
+    for result in results:
+        result['segundos'] = seconds
+        result['multi_periodo'] = bool(multi_period)
+        result['hojas_en_cache'] = cached_sheets
+    return results
 
-        try:
-            title_col_indices = self._parse_col_range(config['title_range'])
-            actual_col_idx = self._col_to_int(config['actual_col'])
-            anterior_col_idx = self._col_to_int(config['anterior_col'])
-        except Exception as e:
-            raise ValueError(f"Error en configuración de columnas: {e}")
 
-        num_cols = len(df.columns) 
-        if actual_col_idx >= num_cols or anterior_col_idx >= num_cols:
-             raise IndexError(f"CONFIGURACIÓN INVÁLIDA: Las columnas de período (Actual: {config['actual_col']}, Anterior: {config['anterior_col']}) están fuera de los límites. El archivo solo tiene {num_cols} columnas.")
-        
-        max_title_col = max(title_col_indices)
-        if max_title_col >= num_cols:
-            print(f"Advertencia: El Rango de Títulos ('{config['title_range']}') incluye una columna (índice {max_title_col}) que está fuera de los límites. El archivo solo tiene {num_cols} columnas.")
+def _safe_file_name(nombre):
+    return re.sub(r'[^\w.-]+', '_', nombre).strip('._') or 'par'
 
-        df_subset = df.iloc[start_row:]
-        
 
-        # --- ¡CAMBIO! Se reemplaza '_' por 'index' para capturar la fila ---
-        for index, row in df_subset.iterrows():
-            title_parts = None
-            original_full_title = None
-            
-            # 1. Encontrar el título en la fila
-            for col_idx in title_col_indices:
-                if col_idx >= num_cols:
-                    continue
-                cell_value = row.iloc[col_idx]
-                title_parts = self._normalize_title(cell_value)
-                if title_parts:
-                    original_full_title = cell_value.strip()
-                    break 
-            
-
-            # 3. Si se encontró título (y no hemos parado), extraer valores
-            if title_parts and original_full_title:
-                number, text = title_parts
-                actual_val = pd.to_numeric(row.iloc[actual_col_idx], errors='coerce')
-                anterior_val = pd.to_numeric(row.iloc[anterior_col_idx], errors='coerce')
-                
-                data_list.append({
-                    'num': number, 'text': text, 'full_title': original_full_title,
-                    'actual': actual_val, 'anterior': anterior_val, 'matched': False,
-                    'row_num': index + 1  # <-- ¡AQUÍ SE GUARDA EL NÚMERO DE FILA (1-based)!
-                })
-                
-        return data_list
+def run_batch(source, year, month, output_dir, workers=None, streaming=False,
+              cache_dir=None, cache_max_bytes=512 * 1024 * 1024, profile=False, profile_memory=False,
+              periods=None, all_periods=False, fuzzy_threshold=None, check_subtotals=False):
+    """
+    Compara todos los pares de `source` en un pool de procesos y escribe
+    un reporte .txt por par, 'resumen.csv' y 'hallazgos.csv' (todos los
+    hallazgos, un registro por fila) en `output_dir`. Con `profile`, cada
+    reporte termina con el perfil de tiempos y se escribe 'perfil.csv'.
+    Con `periods` (lista de (año, mes)) o `all_periods`, cada par se
+    compara para todos esos períodos en una sola pasada y se escribe un
+    reporte por par y período ('<nombre>_<AAAA-MM>.txt').
+    `fuzzy_threshold` activa la coincidencia aproximada de títulos y
+    `check_subtotals`, la validación de subtotales por numeración.
+    Devuelve la lista de resultados en el orden del manifiesto.
+    """
+    pairs = _discover_pairs(source)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [dict(pair, year=year, month=month, streaming=streaming,
+                 cache_dir=cache_dir, cache_max_bytes=cache_max_bytes,
+                 profile=profile, profile_memory=profile_memory,
+                 periods=periods, all_periods=all_periods, fuzzy_threshold=fuzzy_threshold,
+                 check_subtotals=check_subtotals) for pair in pairs]
+
+    job_results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_batch_job, job): pos for pos, job in enumerate(jobs)}
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            job_results[futures[future]] = future.result()
+            for result in job_results[futures[future]]:
+                print(f"[{done_count}/{len(jobs)}] {result['nombre']} {result['periodo']}: {result['estado']} "
+                      f"({result['inconsistencias']} inconsistencias, {result['segundos']}s)")
+    results = [result for period_results in job_results for result in period_results]
+
+    used_names = set()
+    for result in results:
+        file_name = _safe_file_name(result['nombre'])
+        if result['multi_periodo'] and result['periodo']:
+            file_name = f"{file_name}_{result['periodo']}"
+        while file_name in used_names:
+            file_name += '_'
+        used_names.add(file_name)
+        result['archivo_reporte'] = f"{file_name}.txt"
+        with open(os.path.join(output_dir, result['archivo_reporte']), 'w', encoding='utf-8') as report_file:
+            report_file.write(result['reporte'])
+
+    summary_fields = ['nombre', 'periodo', 'estado', 'inconsistencias', 'segundos', 'cliente', 'salida', 'archivo_reporte']
+    with open(os.path.join(output_dir, 'resumen.csv'), 'w', newline='', encoding='utf-8') as summary_file:
+        writer = csv.DictWriter(summary_file, fieldnames=summary_fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+    with open(os.path.join(output_dir, 'hallazgos.csv'), 'w', newline='', encoding='utf-8') as findings_file:
+        writer = csv.DictWriter(findings_file, fieldnames=('nombre', 'periodo') + Finding.FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerows(dict(record, nombre=result['nombre'], periodo=result['periodo'])
+                             for record in result['hallazgos'])
+
+    if profile:
+        with open(os.path.join(output_dir, 'perfil.csv'), 'w', newline='', encoding='utf-8') as profile_file:
+            writer = csv.DictWriter(profile_file, fieldnames=('nombre',) + StageTiming.FIELDS)
+            writer.writeheader()
+            for result in results:
+                writer.writerows(dict(record, nombre=result['nombre']) for record in result['perfil'])
+
+    return results
+
+
+# --- MODO SERVICIO (HTTP local) ---
+# Servicio de larga vida para llamar al comparador desde otras herramientas
+# sin pagar en cada llamada el arranque del intérprete, de pandas y la
+# lectura de libros que no cambiaron.
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{64}\.xlsx?$')
+
+
+class ServiceBusy(Exception):
+    """El servicio ya tiene el máximo de pedidos en curso y en cola."""
+
+
+def _is_loopback(host):
+    """True si `host` (IP o nombre) solo resuelve a direcciones locales (127.x, ::1)."""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except (OSError, UnicodeError):
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split('%')[0]).is_loopback
+                                   for address in addresses)
+
+
+def _init_service_worker(cache_dir, cache_max_bytes, cache_max_entries):
+    """
+    Inicializador de cada proceso del servicio: carga pandas, numpy y
+    openpyxl una sola vez y arma el caché de hojas del proceso.
+    """
+    global _WORKER_CACHE
+    # Ctrl+C lo atiende el proceso principal, que cierra el pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _import_dependencies()
+    importlib.import_module('openpyxl')
+    _WORKER_CACHE = SheetCache(cache_dir, cache_max_bytes) if cache_dir else MemorySheetCache(cache_max_entries)
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _json_safe(value):
+    """Copia de `value` apta para JSON estricto: NaN e infinitos pasan a None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+class ComparisonService:
+    """
+    Pool de procesos "calientes" que atiende pedidos de comparación (lo usa
+    serve(); también se puede usar directamente desde Python).
+
+    - Cada proceso carga pandas y openpyxl al iniciar y guarda las hojas ya
+      extraídas en su MemorySheetCache (hasta `cache_max_entries` hojas por
+      proceso): un pedido sobre archivos sin cambios (misma ruta, fecha y
+      tamaño) y el mismo período no los vuelve a leer. Ese caché es de cada
+      proceso: un pedido repetido que cae en otro proceso vuelve a leer los
+      libros (hasta que todos los tengan). Con `cache_dir` los procesos
+      comparten, en cambio, el SheetCache en disco y el primer pedido sirve
+      para todos.
+    - Admite a lo sumo `workers + queue_size` pedidos a la vez (en curso o
+      esperando); el siguiente se rechaza con ServiceBusy en lugar de
+      encolarse sin límite.
+    - Los archivos subidos se guardan en `upload_dir` con su hash de
+      contenido como nombre: subir otra vez el mismo archivo reutiliza la
+      ruta y, con ella, sus hojas en caché. Sin `upload_dir` se usa un
+      directorio temporal que se borra en close(). Cuando los subidos
+      superan `upload_max_bytes` o `upload_max_files` se borran primero los
+      usados hace más tiempo.
+    - Con `roots` (lista de directorios) los pedidos por ruta solo pueden
+      leer archivos dentro de esos directorios. Sin `roots`, cualquier
+      proceso local que llegue al puerto puede hacer abrir cualquier archivo
+      que pueda leer el usuario del servicio.
+    """
+
+    def __init__(self, workers=None, queue_size=16, cache_dir=None, cache_max_bytes=512 * 1024 * 1024,
+                 cache_max_entries=256, upload_dir=None, upload_max_bytes=1024 * 1024 * 1024,
+                 upload_max_files=256, roots=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self._worker_args = (cache_dir, cache_max_bytes, cache_max_entries)
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._lock = threading.Lock()
+        self.stats = {'en_curso': 0, 'atendidos': 0, 'rechazados': 0}
+        self.started = time.time()
+
+        self._own_upload_dir = upload_dir is None
+        self.upload_dir = upload_dir or tempfile.mkdtemp(prefix='comparador_subidas_')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.upload_max_bytes = upload_max_bytes
+        self.upload_max_files = upload_max_files
+        self._upload_lock = threading.Lock()
+        self.roots = [os.path.realpath(root) for root in roots or ()]
+        self._pool = self._start_pool()
+
+    def _start_pool(self):
+        # 'spawn': los procesos no heredan los hilos del servidor HTTP (fork con hilos no es seguro)
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_service_worker, initargs=self._worker_args)
+        # Levanta todos los procesos ahora: el primer pedido no paga la carga de pandas
+        for future in [pool.submit(_worker_pid) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, procesos=self.workers, capacidad=self.workers + self.queue_size,
+                        segundos_activo=round(time.time() - self.started, 1))
 
-    def _check_values(self, context, title, cliente_val, salida_val):
+    def run(self, job):
         """
-        Lógica de comparación específica con reglas de 0 y multiplicador 1000,
-        usando el VALOR ABSOLUTO de enteros (INT).
+        Corre `job` (dict de _run_batch_job) en un proceso del pool y
+        devuelve sus resultados, uno por período. Lanza ServiceBusy si no
+        hay lugar en la cola.
         """
-        
-        # 1. Tratar NaN (vacío) como 0 ANTES de cualquier cálculo
-        cliente_val = cliente_val if pd.notna(cliente_val) else 0
-        salida_val = salida_val if pd.notna(salida_val) else 0 
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['rechazados'] += 1
+            raise ServiceBusy(f"Servicio ocupado: ya hay {self.workers + self.queue_size} pedidos en curso o en cola.")
+        with self._lock:
+            self.stats['en_curso'] += 1
+        pool = self._pool
+        try:
+            results = pool.submit(_run_batch_job, job).result()
+        except BrokenProcessPool:
+            # Murió un proceso (ej: sin memoria): se rearma el pool para los pedidos siguientes
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = self._start_pool()
+            pool.shutdown(wait=False)
+            raise
+        finally:
+            with self._lock:
+                self.stats['en_curso'] -= 1
+            self._slots.release()
+        with self._lock:
+            self.stats['atendidos'] += 1
+        return results
 
-        # 2. Escalar valor de Salida y REDONDEAR al entero más cercano
-        #    Luego, forzar la conversión a int.
-        salida_scaled = int(round(salida_val / 1000.0))
-        
-        # 3. Redondear valor de Cliente y forzar la conversión a int.
-        cliente_val = int(round(cliente_val))
+    def store_upload(self, data, file_name=''):
+        """Guarda el contenido de un libro subido y devuelve su id ('<sha256>.xlsx' o '.xls')."""
+        extension = '.xls' if os.path.splitext(file_name)[1].lower() == '.xls' else '.xlsx'
+        upload_id = hashlib.sha256(data).hexdigest() + extension
+        path = os.path.join(self.upload_dir, upload_id)
+        with self._upload_lock:
+            if os.path.exists(path):
+                # No se reescribe (conserva sus hojas en caché): solo cuenta como usado
+                self._touch_upload(path)
+            else:
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as upload_file:
+                    upload_file.write(data)
+                os.replace(tmp_path, path)
+                self._evict_uploads(keep=path)
+        return upload_id
 
-        # --- ¡AQUÍ ESTÁ LA MODIFICACIÓN! ---
-        # 4. Obtener el valor absoluto de ambos números
-        abs_cliente_val = abs(cliente_val)
-        abs_salida_scaled = abs(salida_scaled)
-        # --- FIN DE LA MODIFICACIÓN ---
+    def upload_path(self, upload_id):
+        """Ruta de un archivo subido con store_upload(); ValueError si no existe."""
+        path = os.path.join(self.upload_dir, upload_id)
+        if not _UPLOAD_ID_RE.match(upload_id) or not os.path.isfile(path):
+            raise ValueError(f"Archivo subido desconocido: '{upload_id}'.")
+        self._touch_upload(path)
+        return path
 
-        # 5. Aplicar reglas de negocio (usando los valores absolutos)
-        
-        # Regla: Si Cliente (abs) es 0, Salida (abs) debe ser 0.
-        if abs_cliente_val == 0:
-            if abs_salida_scaled != 0:
-                self.inconsistencias.append(
-                    f"[{context}] '{title}': Cliente es 0, pero Salida reporta valor (Escalado: {abs_salida_scaled})."
-                )
-            return 
+    def _touch_upload(self, path):
+        # La fecha de acceso se guarda en el atime: el mtime lo usa el caché de hojas
+        stat = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
 
-        # Regla: Si Cliente (abs) NO es 0, deben coincidir EXACTAMENTE.
-        if abs_cliente_val != abs_salida_scaled:
-            self.inconsistencias.append(
-                f"[{context}] '{title}': DISCREPANCIA . Cliente: {abs_cliente_val}, Salida (Escalado): {abs_salida_scaled}."
-            )
+    def _evict_uploads(self, keep):
+        """Borra los subidos usados hace más tiempo hasta volver a los límites (nunca `keep`)."""
+        entries = []
+        with os.scandir(self.upload_dir) as it:
+            for entry in it:
+                if _UPLOAD_ID_RE.match(entry.name) and entry.path != keep:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+        total = os.path.getsize(keep) + sum(size for _, size, _ in entries)
+        count = len(entries) + 1
+        for _, size, path in sorted(entries):
+            if total <= self.upload_max_bytes and count <= self.upload_max_files:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            count -= 1
 
-    # --- MÉTODO compare ACTUALIZADO ---
-    def compare(self):
+    def _request_file(self, payload, role):
+        """Ruta del archivo de `role` ('cliente'/'salida') según el pedido."""
+        if payload.get(f'{role}_base64') is not None:
+            try:
+                data = base64.b64decode(payload[f'{role}_base64'], validate=True)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{role}_base64' no es un contenido base64 válido.")
+            return self.upload_path(self.store_upload(data, str(payload.get(f'{role}_nombre') or '')))
+        if payload.get(f'{role}_archivo') is not None:
+            return self.upload_path(str(payload[f'{role}_archivo']))
+        if payload.get(role):
+            path = os.path.realpath(str(payload[role]))
+            if self.roots and not any(os.path.commonpath([root, path]) == root for root in self.roots):
+                raise ValueError(f"El archivo de {role} está fuera de los directorios permitidos: '{payload[role]}'.")
+            if not os.path.isfile(path):
+                raise ValueError(f"No existe el archivo de {role}: '{payload[role]}'.")
+            return path
+        raise ValueError(f"Falta el archivo de {role}: '{role}' (ruta), '{role}_archivo' o '{role}_base64'.")
+
+    def build_job(self, payload):
         """
-        Método principal. La auto-detección ahora ocurre DENTRO del bucle.
+        Valida un pedido (dict del JSON recibido) y arma el trabajo de
+        _run_batch_job. Campos:
+
+          cliente, salida              rutas en este equipo (dentro de `roots`,
+                                       si se configuraron), o bien
+          cliente_archivo, ...         ids devueltos por POST /archivos, o bien
+          cliente_base64, ...          el contenido del libro (con cliente_nombre
+                                       opcional para indicar '.xls')
+          year, month                  período; o periods: ["AAAA-MM", ...];
+                                       o all_periods: true
+          fuzzy                        true (umbral por defecto) o umbral 0-1
+          subtotals                    true para validar subtotales por numeración
+          streaming                    booleano
+          nombre                       etiqueta de los resultados
+
+        Lanza ValueError con un mensaje para quien hizo el pedido.
         """
-        self.inconsistencias = []
+        if not isinstance(payload, dict):
+            raise ValueError("El pedido debe ser un objeto JSON.")
+        job = {'nombre': str(payload.get('nombre') or 'par'),
+               'cliente': self._request_file(payload, 'cliente'),
+               'salida': self._request_file(payload, 'salida')}
 
+        periods = payload.get('periods')
+        all_periods = bool(payload.get('all_periods'))
+        if periods is not None:
+            if all_periods:
+                raise ValueError("Use 'periods' o 'all_periods', no ambos.")
+            if not isinstance(periods, list) or not periods:
+                raise ValueError("'periods' debe ser una lista de períodos 'AAAA-MM'.")
+            periods = [_parse_period_value(str(value)) for value in periods]
         try:
-            cliente_sheet_names = pd.ExcelFile(self.cliente_path).sheet_names
-            salida_sheet_names = pd.ExcelFile(self.salida_path).sheet_names
-        except Exception as e:
-            self.inconsistencias.append(f"ERROR CRÍTICO: No se pudo abrir uno de los archivos Excel. Detalle: {e}")
-            return "\n".join(self.inconsistencias)
-
-        for cliente_sheet_idx, salida_sheet_idx in self.sheet_map:
-            
-            cliente_config = None
-            salida_config = None
-            sheet_context = f"(Hoja Cliente idx {cliente_sheet_idx+1} vs Hoja Salida idx {salida_sheet_idx+1})" 
-            
-            try:
-                cliente_sheet_name = cliente_sheet_names[cliente_sheet_idx]
-                salida_sheet_name = salida_sheet_names[salida_sheet_idx]
-                sheet_context = f"Hoja '{cliente_sheet_name}' vs Hoja '{salida_sheet_name}'"
-
-                self.inconsistencias.append(f"\n")
-                cliente_config = self._detect_columns(self.cliente_path, cliente_sheet_idx)
-                self.inconsistencias.append(f"  -> Cliente OK: Títulos en '{cliente_config['title_range']}', Actual en '{cliente_config['actual_col']}'")
-
-                salida_config = self._detect_columns(self.salida_path, salida_sheet_idx)
-                self.inconsistencias.append(f"  -> Salida OK: Títulos en '{salida_config['title_range']}', Actual en '{salida_config['actual_col']}'")
-                
-                df_cliente = pd.read_excel(self.cliente_path, sheet_name=cliente_sheet_idx, header=None)
-                df_salida = pd.read_excel(self.salida_path, sheet_name=salida_sheet_idx, header=None)
-            
-            except Exception as e:
-                self.inconsistencias.append(f"ERROR: No se pudo procesar/detectar {sheet_context}. Detalle: {e}")
-                continue 
-
-            start_row_cliente = self._find_start_row(df_cliente, cliente_config['title_range'])
-            start_row_salida = self._find_start_row(df_salida, salida_config['title_range'])
-            
-            if start_row_cliente is None:
-                self.inconsistencias.append(f"ADVERTENCIA: No se encontraron títulos en {sheet_context} (Cliente).")
-                continue
-            if start_row_salida is None:
-                self.inconsistencias.append(f"ADVERTENCIA: No se encontraron títulos en {sheet_context} (Salida).")
-                continue
+            year, month = (int(payload['year']), int(payload['month'])) \
+                if payload.get('year') is not None or not periods else periods[0]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Faltan 'year' y 'month' (enteros) o 'periods'.")
+        error = _period_error(year, month)
+        if error:
+            raise ValueError(error)
 
-            data_cliente = self._process_dataframe(df_cliente, start_row_cliente, cliente_config)
-            data_salida = self._process_dataframe(df_salida, start_row_salida, salida_config)
+        fuzzy = payload.get('fuzzy')
+        if fuzzy is True:
+            fuzzy = FUZZY_DEFAULT_THRESHOLD
+        elif fuzzy in (None, False):
+            fuzzy = None
+        elif isinstance(fuzzy, bool) or not isinstance(fuzzy, (int, float)) or not 0 < fuzzy <= 1:
+            raise ValueError("'fuzzy' debe ser true o un umbral mayor que 0 y hasta 1.")
 
-            if not data_cliente:
-                 self.inconsistencias.append(f"ADVERTENCIA: No se extrajeron datos de Cliente en {sheet_context}.")
-                 continue
-            if not data_salida:
-                 self.inconsistencias.append(f"ADVERTENCIA: No se extrajeron datos de Salida en {sheet_context}.")
-                 continue
-                 
-            # 6.A. Lógica de Coincidencia por NÚMERO
-            for cliente_item in data_cliente:
-                found_match = None
-                for salida_item in data_salida:
-                    if not salida_item['matched'] and cliente_item['num'] == salida_item['num']:
-                        found_match = salida_item
-                        break 
-                if found_match:
-                    cliente_item['matched'] = True
-                    found_match['matched'] = True
-                    self._check_values(f"{sheet_context} [Actual]", cliente_item['full_title'], cliente_item['actual'], found_match['actual'])
-                    self._check_values(f"{sheet_context} [Anterior]", cliente_item['full_title'], cliente_item['anterior'], found_match['anterior'])
+        job.update(year=year, month=month, periods=periods, all_periods=all_periods,
+                   streaming=bool(payload.get('streaming')), fuzzy_threshold=fuzzy,
+                   check_subtotals=bool(payload.get('subtotals')))
+        return job
 
-            # 6.B. Lógica de Coincidencia por TEXTO
-            for cliente_item in data_cliente:
-                if cliente_item['matched']: continue
-                found_match = None
-                for salida_item in data_salida:
-                    if not salida_item['matched'] and cliente_item['text'] == salida_item['text']:
-                        found_match = salida_item
-                        break
-                if found_match:
-                    cliente_item['matched'] = True
-                    found_match['matched'] = True
-                    self.inconsistencias.append(
-                        f"[{sheet_context}] [AVISO] Coincidencia por TEXTO: Cliente ('{cliente_item['full_title']}') vs Salida ('{found_match['full_title']}')"
-                    )
-                    self._check_values(f"{sheet_context} [Actual]", cliente_item['full_title'], cliente_item['actual'], found_match['actual'])
-                    self._check_values(f"{sheet_context} [Anterior]", cliente_item['full_title'], cliente_item['anterior'], found_match['anterior'])
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._own_upload_dir:
+            shutil.rmtree(self.upload_dir, ignore_errors=True)
 
-            # 6.C. Reportar FALTANTES en Salida
-            for cliente_item in data_cliente:
-                if not cliente_item['matched']:
-                    cliente_actual = cliente_item['actual'] if pd.notna(cliente_item['actual']) else 0
-                    cliente_anterior = cliente_item['anterior'] if pd.notna(cliente_item['anterior']) else 0
-                    if cliente_actual != 0 or cliente_anterior != 0:
-                        # --- ¡CAMBIO! Se añade la fila del cliente ---
-                        self.inconsistencias.append(
-                            f"[{sheet_context}] (Fila Cliente: {cliente_item['row_num']}) '{cliente_item['full_title']}': Título FALTA en Salida (Valores Cliente: {cliente_actual}, {cliente_anterior})."
-                        )
-            
-            # 6.D. Reportar SOBRANTES en Salida
-            for salida_item in data_salida:
-                if not salida_item['matched']:
-                    salida_actual = salida_item['actual'] if pd.notna(salida_item['actual']) else 0
-                    salida_anterior = salida_item['anterior'] if pd.notna(salida_item['anterior']) else 0
-                    if salida_actual != 0 or salida_anterior != 0:
-                        salida_scaled_actual = abs(int(round(salida_actual / 1000.0)))
-                        salida_scaled_anterior = abs(int(round(salida_anterior / 1000.0)))
-                        if salida_scaled_actual != 0 or salida_scaled_anterior != 0:
-                            # --- ¡CAMBIO! Se añade la fila de salida ---
-                            self.inconsistencias.append(
-                                f"[{sheet_context}] (Fila Salida: {salida_item['row_num']}) '{salida_item['full_title']}': Título SOBRA en Salida, no existe en Cliente (Valores Salida escalados: {salida_scaled_actual}, {salida_scaled_anterior})."
-                            )
-
-        if not self.inconsistencias:
-            return "--- PROCESO COMPLETADO --- \n\n¡No se encontraron inconsistencias!"
-            
-        final_messages = [msg for msg in self.inconsistencias 
-                          if not msg.startswith("  ->") and not msg.endswith("Detectando...")]
-        
-        if not final_messages:
-            return "--- PROCESO COMPLETADO --- \n\n¡No se encontraron inconsistencias!"
 
-        return "--- PROCESO COMPLETADO --- \n\nSe encontraron las siguientes inconsistencias:\n\n" + "\n".join(final_messages)
+def serve(host='127.0.0.1', port=8765, workers=None, queue_size=16, cache_dir=None,
+          cache_max_bytes=512 * 1024 * 1024, cache_max_entries=256, upload_dir=None,
+          max_upload_bytes=256 * 1024 * 1024, roots=None, ready=None):
+    """
+    Servicio HTTP local (solo biblioteca estándar) sobre ComparisonService:
+
+      POST /comparar   pedido JSON (ver ComparisonService.build_job) ->
+                       {"resultados": [{nombre, periodo, estado, inconsistencias,
+                        segundos, hojas_en_cache, reporte, hallazgos}, ...]}
+      POST /archivos   cuerpo: el contenido de un libro (?nombre=libro.xls
+                       para .xls) -> {"archivo": id para 'cliente_archivo'}
+      GET  /estado     procesos, capacidad, pedidos en curso, atendidos y rechazados
+
+    Errores como {"error": mensaje}: 400 (pedido inválido), 404, 413
+    (cuerpo mayor a `max_upload_bytes`), 503 (cola llena, con Retry-After)
+    y 500. Atiende hasta Ctrl+C o server.shutdown(); `ready(server)` se
+    llama con el servidor ya escuchando (con port=0 se elige un puerto
+    libre: ver server.server_address).
+
+    El servicio no tiene autenticación: solo escucha en direcciones locales
+    (ValueError con cualquier otro `host`). Con `roots` los pedidos por ruta
+    quedan limitados a esos directorios; sin `roots` se abre cualquier ruta
+    que pueda leer el usuario del servicio. El caché de hojas es de cada
+    proceso del pool salvo con `cache_dir` (ver ComparisonService).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    if not _is_loopback(host):
+        raise ValueError(f"El servicio no tiene autenticación: solo escucha en direcciones locales, no en '{host}'.")
+    service = ComparisonService(workers, queue_size, cache_dir, cache_max_bytes, cache_max_entries, upload_dir,
+                                roots=roots)
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass  # Cada comparación ya se informa con su resultado
+
+        def _reply(self, status, body, headers=()):
+            data = json.dumps(_json_safe(body), ensure_ascii=False, allow_nan=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length < 0:
+                # rfile.read(-1) esperaría el cierre de la conexión
+                raise ValueError(f"Content-Length negativo: {length}.")
+            if length > max_upload_bytes:
+                raise OverflowError(f"El cuerpo supera el máximo de {max_upload_bytes // (1024 * 1024)} MB.")
+            return self.rfile.read(length)
+
+        def do_GET(self):
+            if urlsplit(self.path).path != '/estado':
+                return self._reply(404, {'error': f"Ruta desconocida: '{self.path}'."})
+            self._reply(200, service.status())
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path not in ('/comparar', '/archivos'):
+                return self._reply(404, {'error': f"Ruta desconocida: '{self.path}'."})
+            try:
+                body = self._body()
+            except OverflowError as e:
+                self.close_connection = True  # El cuerpo no se leyó
+                return self._reply(413, {'error': str(e)})
+            except ValueError:
+                self.close_connection = True
+                return self._reply(400, {'error': "Content-Length inválido."})
+
+            if url.path == '/archivos':
+                nombre = (parse_qs(url.query).get('nombre') or [''])[0]
+                return self._reply(200, {'archivo': service.store_upload(body, nombre)})
+
+            try:
+                job = service.build_job(json.loads(body or b'null'))
+            except ValueError as e:  # Incluye JSON inválido
+                return self._reply(400, {'error': str(e)})
+            try:
+                results = service.run(job)
+            except ServiceBusy as e:
+                return self._reply(503, {'error': str(e)}, headers=[('Retry-After', '1')])
+            except Exception as e:
+                return self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+            for result in results:
+                print(f"[{time.strftime('%H:%M:%S')}] {result['nombre']} {result['periodo']}: {result['estado']} "
+                      f"({result['inconsistencias']} inconsistencias, {result['segundos']}s, "
+                      f"{result['hojas_en_cache']} hojas en caché)", flush=True)
+            self._reply(200, {'resultados': [
+                {key: value for key, value in result.items() if key not in ('perfil', 'multi_periodo')}
+                for result in results]})
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    try:
+        if ready is not None:
+            ready(server)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
+    return 0
 
 
 # --- CLASE ComparisonApp ACTUALIZADA ---
@@ -378,6 +2926,7 @@ class ComparisonApp:
     Construye y maneja la interfaz gráfica (GUI) con Tkinter.
     """
     def __init__(self, root):
+        _load_tkinter()
         self.root = root
         self.root.title("Comparador de Archivos Excel (Auto-Detección)")
         self.setup_dpi()
@@ -425,10 +2974,35 @@ class ComparisonApp:
         self.month_entry = ttk.Spinbox(config_frame, from_=1, to=12, width=8, textvariable=self.month_var, format="%02.0f")
         self.month_entry.grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
 
+        self.show_profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(config_frame, text="Mostrar tiempos por etapa al final del reporte",
+                        variable=self.show_profile_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, padx=5, pady=2)
+
+        # Todos los períodos de las hojas (ej: los trimestres del año) en una sola pasada
+        self.all_periods_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(config_frame, text="Comparar todos los períodos detectados (un reporte por período)",
+                        variable=self.all_periods_var).grid(row=3, column=0, columnspan=2, sticky=tk.W, padx=5, pady=2)
+
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(config_frame, text=f"Coincidencia aproximada de títulos (similitud ≥ {FUZZY_DEFAULT_THRESHOLD:.0%})",
+                        variable=self.fuzzy_var).grid(row=4, column=0, columnspan=2, sticky=tk.W, padx=5, pady=2)
 
-        # --- Sección de Acción (Sin cambios) ---
+        # Cada cuenta con subcuentas ('1.2' de '1.2.1', '1.2.2', ...) debe ser la suma de ellas
+        self.subtotals_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(config_frame, text="Validar subtotales según la numeración de las cuentas",
+                        variable=self.subtotals_var).grid(row=5, column=0, columnspan=2, sticky=tk.W, padx=5, pady=2)
+
+        # Sin tildar no se lee ni se escribe nada en el directorio de caché del usuario
+        self.disk_cache_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(config_frame, text="Reutilizar las hojas ya leídas (caché en disco)",
+                        variable=self.disk_cache_var).grid(row=6, column=0, columnspan=2, sticky=tk.W, padx=5, pady=2)
+
+        # --- Sección de Acción ---
         self.run_button = ttk.Button(main_frame, text="🚀 Ejecutar Comparación", command=self.run_comparison)
-        self.run_button.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10, ipady=5)
+        self.run_button.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=10, ipady=5)
+        self.cancel_button = ttk.Button(main_frame, text="✖ Cancelar", command=self.cancel_comparison, state=tk.DISABLED)
+        self.cancel_button.grid(row=2, column=1, sticky=(tk.W, tk.E), padx=(5, 0), pady=10, ipady=5)
+        main_frame.columnconfigure(0, weight=1)
 
         # --- Sección de Resultados (Sin cambios) ---
         results_frame = ttk.Labelframe(main_frame, text="3. Resultados", padding="10")
@@ -440,10 +3014,19 @@ class ComparisonApp:
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(0, weight=1)
 
+        self.status_var = tk.StringVar(value="Listo.")
+        ttk.Label(main_frame, textvariable=self.status_var).grid(row=4, column=0, columnspan=2, sticky=tk.W)
+
+        # La comparación corre en un hilo aparte; sus eventos llegan por esta
+        # cola y se vuelcan a la ventana desde el hilo de Tk (_poll_events).
+        self.comparator = None
+        self.events = queue.Queue()
+
     def setup_dpi(self):
         """Configura el escalado de DPI para Windows."""
         if os.name == 'nt':
             try:
+                import ctypes  # Solo para esta llamada de Windows
                 ctypes.windll.shcore.SetProcessDpiAwareness(1)
             except Exception as e:
                 print(f"Advertencia: No se pudo establecer el DPI awareness. {e}")
@@ -487,31 +3070,296 @@ class ComparisonApp:
 
         # 2. Deshabilitar botón y mostrar "Procesando"
         self.run_button.config(text="Procesando... ⏳", state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
         self.results_text.delete(1.0, tk.END)
         self.results_text.insert(tk.END, "Iniciando comparación...\n")
-        self.root.update_idletasks() 
 
-        # 3. Ejecutar la lógica de negocio (constructor actualizado)
+        # 3. Ejecutar la lógica de negocio en segundo plano (la ventana sigue respondiendo)
+        # Las 3 hojas se procesan en hilos: comparten los libros abiertos, informan
+        # cada etapa y se detienen al cancelar (con 'process' no hay ni una ni otra cosa)
+        # El caché evita re-parsear el archivo que no cambió entre corridas
+        self.events = queue.Queue()
+        self.comparator = ExcelComparator(cliente_path, salida_path, year, month, parallel='thread',
+                                          cache=SheetCache() if self.disk_cache_var.get() else None,
+                                          progress_callback=self._on_progress,
+                                          fuzzy_threshold=FUZZY_DEFAULT_THRESHOLD if self.fuzzy_var.get() else None,
+                                          check_subtotals=self.subtotals_var.get())
+        threading.Thread(target=self._comparison_worker,
+                         args=(self.comparator, self.events, self.show_profile_var.get(), self.all_periods_var.get()),
+                         daemon=True).start()
+        self.root.after(100, self._poll_events)
+
+    def cancel_comparison(self):
+        """Pide cancelar la comparación en curso (se detiene en la próxima etapa)."""
+        if self.comparator is not None:
+            self.comparator.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_var.set("Cancelando...")
+
+    def _on_progress(self, event, **details):
+        """progress_callback: corre en hilos de trabajo, solo encola."""
+        self.events.put((event, details))
+
+    def _comparison_worker(self, comparator, events, show_profile=False, all_periods=False):
         try:
-            comparator = ExcelComparator(cliente_path, salida_path, year, month)
-            results = comparator.compare()
-            
-            # 4. Mostrar resultados
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, results)
-            
+            if all_periods:
+                text = format_period_reports(comparator.compare_periods())
+            else:
+                text = comparator.compare()
+            if show_profile:
+                text += "\n\n" + comparator.profile.summary()
+            events.put(('result', {'text': text}))
+        except ComparisonCancelled:
+            events.put(('cancelled', {}))
         except Exception as e:
-            # 5. Manejar errores
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, f"--- ERROR INESPERADO ---\n\n{type(e).__name__}: {e}")
-            messagebox.showerror("Error en Procesamiento", f"Ocurrió un error: {e}")
-        
-        finally:
-            # 6. Reactivar el botón
-            self.run_button.config(text="🚀 Ejecutar Comparación", state=tk.NORMAL)
+            events.put(('error', {'error': e}))
+
+    def _poll_events(self):
+        """Vuelca en la ventana los eventos encolados por la comparación."""
+        stage_labels = {'apertura': "Abriendo archivos", 'deteccion': "Detectando columnas",
+                        'extraccion': "Extrayendo títulos", 'coincidencias': "Buscando coincidencias",
+                        'faltantes': "Buscando faltantes/sobrantes", 'subtotales': "Validando subtotales",
+                        'fin': "Armando reporte"}
+        while True:
+            try:
+                event, details = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event == 'stage':
+                sheet = details['sheet']
+                where = f" (Hoja Cliente {sheet[0]+1} vs Salida {sheet[1]+1})" if sheet else ""
+                self.status_var.set(f"{stage_labels.get(details['stage'], details['stage'])}{where}...")
+            elif event == 'sheet' and details['status'] == 'done':
+                # Hallazgos en vivo, par por par (en el orden de las hojas)
+                findings = details['findings']
+                self.results_text.insert(tk.END, f"\n[Par {details['index']+1}/{details['total']}] "
+                                                 f"{len(findings)} hallazgo(s)\n")
+                for finding in findings:
+                    self.results_text.insert(tk.END, finding.render() + "\n")
+                self.results_text.see(tk.END)
+            elif event == 'result':
+                # 4. Mostrar resultados
+                self.results_text.delete(1.0, tk.END)
+                self.results_text.insert(tk.END, details['text'])
+                self._finish_run("Comparación completada.")
+                return
+            elif event == 'cancelled':
+                self.results_text.insert(tk.END, "\n--- COMPARACIÓN CANCELADA ---\n")
+                self._finish_run("Comparación cancelada.")
+                return
+            elif event == 'error':
+                # 5. Manejar errores
+                e = details['error']
+                self.results_text.delete(1.0, tk.END)
+                self.results_text.insert(tk.END, f"--- ERROR INESPERADO ---\n\n{type(e).__name__}: {e}")
+                self._finish_run("Error en el procesamiento.")
+                messagebox.showerror("Error en Procesamiento", f"Ocurrió un error: {e}")
+                return
+
+        self.root.after(100, self._poll_events)
+
+    def _finish_run(self, status):
+        # 6. Reactivar el botón
+        self.comparator = None
+        self.status_var.set(status)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.run_button.config(text="🚀 Ejecutar Comparación", state=tk.NORMAL)
+
+
+def _period_error(year, month):
+    """Mensaje de error si (año, mes) está fuera de rango; None si es válido."""
+    if not (1 <= month <= 12):
+        return "Mes fuera de rango 1-12"
+    if not (1900 < year < 2100):
+        return "Año fuera de rango 1900-2100"
+    return None
+
+
+def _valid_period_arg(parser, year, month):
+    error = _period_error(year, month)
+    if error:
+        parser.error(error)
+
+
+def _parse_period_value(value):
+    """'2024-06' -> (2024, 6); ValueError si el formato o el período no son válidos."""
+    match = re.fullmatch(r'(\d{4})-(\d{1,2})', value.strip())
+    if not match:
+        raise ValueError(f"Período inválido: '{value}'. Use el formato AAAA-MM (ej: 2024-06).")
+    year, month = int(match.group(1)), int(match.group(2))
+    error = _period_error(year, month)
+    if error:
+        raise ValueError(error)
+    return year, month
+
+
+def _parse_periods_arg(parser, values):
+    """['2024-06', '2024-03'] -> [(2024, 6), (2024, 3)], validando cada período."""
+    periods = []
+    for value in values:
+        try:
+            periods.append(_parse_period_value(value))
+        except ValueError as e:
+            parser.error(str(e))
+    return periods
+
+
+def main(argv=None):
+    """
+    Sin argumentos abre la GUI. Con --batch compara muchos pares sin GUI:
+
+        python ComparadorEstadosFinancieros.py --batch pares.csv --year 2024 --month 6
+        python ComparadorEstadosFinancieros.py --batch pares.csv --periods 2024-03 2024-06
+
+    Con --watch vigila un par y lo vuelve a comparar cada vez que se guarda:
+
+        python ComparadorEstadosFinancieros.py --watch cliente.xlsx salida.xlsx --year 2024 --month 6
+
+    Con --serve queda atendiendo pedidos HTTP locales (ver serve()):
+
+        python ComparadorEstadosFinancieros.py --serve --port 8765 --workers 4
+        curl -d '{"cliente": "/ruta/cliente.xlsx", "salida": "/ruta/salida.xlsx", "year": 2024, "month": 6}' \\
+            http://127.0.0.1:8765/comparar
+    """
+    parser = argparse.ArgumentParser(description="Comparador de Estados Financieros (Cliente vs Salida).")
+    parser.add_argument('--batch', metavar='MANIFIESTO_O_DIRECTORIO',
+                        help="CSV con columnas cliente,salida[,nombre] o directorio con '<entidad>_cliente.xlsx' / '<entidad>_salida.xlsx'.")
+    parser.add_argument('--year', type=int, help="Año del período actual (YYYY).")
+    parser.add_argument('--month', type=int, help="Mes del período actual (1-12).")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Cantidad de procesos en paralelo (por defecto, uno por núcleo).")
+    parser.add_argument('--output-dir', default='resultados_batch',
+                        help="Directorio donde se escriben los reportes, resumen.csv y hallazgos.csv.")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lee las hojas en streaming y corta cada estado tras 4 filas seguidas sin título.")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Directorio del caché de hojas extraídas (por defecto, sin caché en modo batch; "
+                             "en modo --serve, un caché en memoria por proceso).")
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help="Tamaño máximo del caché en MB (se borran primero las entradas más viejas).")
+    parser.add_argument('--profile', action='store_true',
+                        help="Agrega el perfil de tiempos por etapa a cada reporte, escribe perfil.csv y muestra el total del lote.")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Como --profile, midiendo también el pico de memoria por etapa (más lento).")
+    parser.add_argument('--periods', nargs='+', metavar='AAAA-MM', default=None,
+                        help="Compara varios períodos en una sola pasada (un reporte por par y período).")
+    parser.add_argument('--all-periods', action='store_true',
+                        help="Compara todos los períodos detectados en las hojas de Cliente, en una sola pasada.")
+    parser.add_argument('--fuzzy', type=float, nargs='?', const=FUZZY_DEFAULT_THRESHOLD, default=None,
+                        metavar='UMBRAL',
+                        help=f"Después de la coincidencia por texto, empareja títulos parecidos (similitud 0-1, "
+                             f"por defecto {FUZZY_DEFAULT_THRESHOLD}).")
+    parser.add_argument('--subtotales', action='store_true',
+                        help="Valida que cada cuenta con subcuentas (según su numeración) sea la suma de ellas, "
+                             "en Cliente y en Salida.")
+    parser.add_argument('--watch', nargs=2, metavar=('CLIENTE', 'SALIDA'), default=None,
+                        help="Vigila el par y lo vuelve a comparar (en forma incremental) cada vez que se guarda.")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="Segundos entre revisiones de los archivos en modo --watch.")
+    parser.add_argument('--serve', action='store_true',
+                        help="Servicio HTTP local: atiende pedidos de comparación con procesos ya iniciados.")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Dirección local del servicio en modo --serve (127.0.0.1, ::1 o localhost).")
+    parser.add_argument('--port', type=int, default=8765, help="Puerto del servicio en modo --serve.")
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help="Pedidos que pueden esperar además de los que están en curso (--serve); "
+                             "los siguientes se rechazan con 503.")
+    parser.add_argument('--root', action='append', dest='roots', metavar='DIRECTORIO', default=None,
+                        help="Directorio desde el que el servicio puede leer archivos por ruta (se puede repetir). "
+                             "Sin --root, cualquier ruta que pueda leer el usuario del servicio.")
+    args = parser.parse_args(argv)
+    if args.fuzzy is not None and not 0 < args.fuzzy <= 1:
+        parser.error("--fuzzy debe ser un umbral mayor que 0 y hasta 1 (ej: 0.85).")
+
+    if args.serve:
+        if args.batch is not None or args.watch is not None:
+            parser.error("--serve no se combina con --batch ni con --watch.")
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers debe ser al menos 1.")
+        if args.queue_size < 0:
+            parser.error("--queue-size no puede ser negativo.")
+        if not _is_loopback(args.host):
+            parser.error(f"--host debe ser una dirección local: el servicio no tiene autenticación ('{args.host}').")
+        missing = [root for root in args.roots or () if not os.path.isdir(root)]
+        if missing:
+            parser.error(f"--root no es un directorio: '{missing[0]}'.")
+
+        def announce(server):
+            host, port = server.server_address[:2]
+            print(f"Servicio de comparación en http://{host}:{port} (Ctrl+C para salir)...", flush=True)
+            if not args.roots:
+                print("Aviso: sin --root, los pedidos pueden leer cualquier archivo de este usuario.", flush=True)
+
+        def stop(signum, frame):
+            raise KeyboardInterrupt
+
+        # SIGTERM (kill, systemd) cierra el servicio y sus procesos igual que Ctrl+C
+        signal.signal(signal.SIGTERM, stop)
+
+        try:
+            serve(args.host, args.port, args.workers, args.queue_size, args.cache_dir,
+                  args.cache_max_mb * 1024 * 1024, roots=args.roots, ready=announce)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.watch is not None:
+        if args.batch is not None:
+            parser.error("Use --batch o --watch, no ambos.")
+        if args.year is None or args.month is None:
+            parser.error("--watch requiere --year y --month.")
+        _valid_period_arg(parser, args.year, args.month)
+        if args.interval <= 0:
+            parser.error("--interval debe ser mayor que 0.")
+        print(f"Vigilando '{args.watch[0]}' y '{args.watch[1]}' (Ctrl+C para salir)...\n", flush=True)
+        try:
+            watch(args.watch[0], args.watch[1], args.year, args.month, interval=args.interval,
+                  streaming=args.streaming, fuzzy_threshold=args.fuzzy, check_subtotals=args.subtotales)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.batch is None:
+        _load_tkinter()
+        root = tk.Tk()
+        app = ComparisonApp(root)
+        # pandas/numpy se cargan en segundo plano, con la ventana ya visible
+        root.after(100, _preload_dependencies)
+        root.mainloop()
+        return 0
+
+    periods = _parse_periods_arg(parser, args.periods) if args.periods else None
+    if periods and args.all_periods:
+        parser.error("Use --periods o --all-periods, no ambos.")
+    if periods and (args.year is None or args.month is None):
+        args.year, args.month = periods[0]
+    if args.year is None or args.month is None:
+        parser.error("--batch requiere --year y --month (o --periods).")
+    _valid_period_arg(parser, args.year, args.month)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers debe ser al menos 1.")
+
+    profile = args.profile or args.profile_memory
+    started = time.perf_counter()
+    results = run_batch(args.batch, args.year, args.month, args.output_dir, args.workers, args.streaming,
+                        args.cache_dir, args.cache_max_mb * 1024 * 1024, profile, args.profile_memory,
+                        periods, args.all_periods, args.fuzzy, args.subtotales)
+    totals = defaultdict(int)
+    for result in results:
+        totals[result['estado']] += 1
+    unit = "reportes (par y período)" if periods or args.all_periods else "pares"
+    print(f"\n--- LOTE COMPLETADO --- {len(results)} {unit}: "
+          f"{totals['OK']} OK, {totals['INCONSISTENCIAS']} con inconsistencias, {totals['ERROR']} con error.")
+    print(f"Resumen: {os.path.join(args.output_dir, 'resumen.csv')}")
+    print(f"Hallazgos: {os.path.join(args.output_dir, 'hallazgos.csv')}")
+    if profile:
+        records = [record for result in results for record in result['perfil']]
+        print("\n" + ComparisonProfile.from_records(records, time.perf_counter() - started).summary(per_sheet=False))
+        print(f"Perfil: {os.path.join(args.output_dir, 'perfil.csv')}")
+    return 1 if totals['ERROR'] else 0
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = ComparisonApp(root)
-    root.mainloop()
\ No newline at end of file
+    multiprocessing.freeze_support()  # Necesario para el pool de procesos en ejecutables de Windows
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Tiempo de arranque de ComparadorEstadosFinancieros, medido en procesos
+nuevos (cada medición es un intérprete recién iniciado):
+
+  importacion   import del módulo (sin pandas, numpy, dateutil ni tkinter)
+  pandas        primer uso de pandas/numpy desde el módulo (carga diferida)
+  ventana       import + Tk + ComparisonApp hasta la ventana dibujada
+                (se omite si no hay display o tkinter)
+
+Para cada etapa informa el mejor tiempo de `--repeat` corridas y qué
+módulos pesados quedaron cargados al terminarla.
+
+Uso:
+    python benchmarks/arranque.py --repeat 5 --json arranque.json
+    python benchmarks/arranque.py --baseline arranque.json   # compara contra una corrida previa
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import informe  # noqa: E402
+
+HEAVY_MODULES = ('pandas', 'numpy', 'dateutil', 'tkinter', 'ctypes')
+
+# Cada script imprime {"segundos": ..., "modulos": [...]} o {"omitido": motivo}
+_PRELUDE = f"""
+import sys, json, time
+started = time.perf_counter()
+sys.path.insert(0, {ROOT!r})
+def done():
+    print(json.dumps({{'segundos': time.perf_counter() - started,
+                      'modulos': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+SCRIPTS = {
+    'importacion': """
+import ComparadorEstadosFinancieros
+done()
+""",
+    'pandas': """
+import ComparadorEstadosFinancieros as comparador
+comparador.pd.DataFrame, comparador.np.ndarray
+done()
+""",
+    'ventana': """
+import ComparadorEstadosFinancieros as comparador
+try:
+    comparador._load_tkinter()
+    root = comparador.tk.Tk()
+except Exception as e:
+    print(json.dumps({'omitido': str(e).splitlines()[0] if str(e) else type(e).__name__}))
+    sys.exit(0)
+app = comparador.ComparisonApp(root)
+root.update()
+done()
+root.destroy()
+""",
+}
+
+
+def _run(stage):
+    completed = subprocess.run([sys.executable, '-c', _PRELUDE + SCRIPTS[stage]], cwd=ROOT,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"La medición '{stage}' falló:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(repeat=5):
+    """{etapa: {'segundos': mejor tiempo, 'modulos': [...]}} (o {'omitido': motivo})."""
+    results = {}
+    for stage in SCRIPTS:
+        best = None
+        for _ in range(max(1, repeat)):
+            run = _run(stage)
+            if 'omitido' in run:
+                best = run
+                break
+            if best is None or run['segundos'] < best['segundos']:
+                best = run
+        results[stage] = best
+    return results
+
+
+def _print_table(report, baseline=None):
+    base_results = (baseline or {}).get('resultados', {})
+    rows = []
+    for stage, measure_ in report['resultados'].items():
+        if 'omitido' in measure_:
+            rows.append((stage, '-', '', f"(omitido: {measure_['omitido']})"))
+            continue
+        base = base_results.get(stage) or {}
+        rows.append((stage, measure_['segundos'], informe.ratio(measure_['segundos'], base.get('segundos')),
+                     ', '.join(measure_['modulos']) or '-'))
+    informe.print_table([('etapa', '<14'), ('segundos', '>9.4f'), ('vs base', '>8'), ('módulos cargados', '')], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de arranque del comparador (procesos nuevos).")
+    parser.add_argument('--repeat', type=int, default=5, help="Corridas por etapa (se informa la mejor).")
+    informe.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = {'python': platform.python_version(), 'repeat': args.repeat, 'resultados': measure(args.repeat)}
+    return informe.finish(report, args, _print_table)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
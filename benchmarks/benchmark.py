@@ -0,0 +1,202 @@
+"""
+Benchmark de las etapas de ExcelComparator sobre libros sintéticos
+(generar_libros.py) de distintos tamaños.
+
+Para cada tamaño mide, por separado, el tiempo (mejor de `--repeat`
+corridas) y el pico de memoria (tracemalloc, en una corrida aparte) de:
+
+  deteccion      _detect_columns (primeras filas: fechas D-L y títulos A-F)
+  lectura        WorkbookSession.projected (solo títulos y columnas de período)
+  inicio         _find_start_row
+  extraccion     _process_dataframe
+  coincidencias  _match_by_key por número y por texto (6.A / 6.B)
+  aproximadas    _match_fuzzy sobre lo que quedó sin par (umbral por defecto)
+  validacion     _check_matched_pairs (reglas de valores en bloque)
+  subtotales     _account_tree + _check_subtotals de la hoja de Cliente
+
+Uso:
+    python benchmarks/benchmark.py --sizes 1000 10000 100000 --json bench.json
+    python benchmarks/benchmark.py --baseline bench.json   # compara contra una corrida previa
+
+Los libros generados se guardan en --work-dir y se reutilizan entre corridas.
+"""
+import os
+import sys
+import gc
+import time
+import platform
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ComparadorEstadosFinancieros as comparador  # noqa: E402
+import informe  # noqa: E402
+from generar_libros import generate_pair  # noqa: E402
+
+YEAR, MONTH = 2024, 6
+# Hoja del primer estado en cada libro (ver generar_libros.generate_pair)
+CLIENTE_SHEET, SALIDA_SHEET = 2, 1
+
+STAGES = ('deteccion', 'lectura', 'inicio', 'extraccion', 'coincidencias', 'aproximadas', 'validacion', 'subtotales')
+
+
+def _measure(func, setup=None, repeat=3):
+    """
+    (segundos, pico_MB, resultado): mejor tiempo de `repeat` corridas y pico
+    de memoria de una corrida extra con tracemalloc. `setup()` prepara los
+    argumentos de cada corrida fuera de la medición.
+    """
+    setup = setup or (lambda: ())
+    best = None
+    for _ in range(max(1, repeat)):
+        args = setup()
+        gc.collect()
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    args = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+
+def _copy_items(items):
+    # Las coincidencias marcan 'matched': cada corrida parte de una copia limpia
+    return [dict(item, matched=False) for item in items]
+
+
+def bench_size(rows, work_dir, repeat=3, seed=0):
+    """Mide todas las etapas para un par de libros de `rows` cuentas."""
+    cliente_path = os.path.join(work_dir, f"bench_{rows}_cliente.xlsx")
+    salida_path = os.path.join(work_dir, f"bench_{rows}_salida.xlsx")
+    if not (os.path.exists(cliente_path) and os.path.exists(salida_path)):
+        print(f"  Generando libros de {rows} cuentas...")
+        generate_pair(cliente_path, salida_path, accounts=rows, depth=4, year=YEAR, month=MONTH,
+                      statements=1, seed=seed)
+
+    comparator = comparador.ExcelComparator(cliente_path, salida_path, YEAR, MONTH,
+                                            fuzzy_threshold=comparador.FUZZY_DEFAULT_THRESHOLD)
+    results = {}
+
+    cliente_session = comparador.WorkbookSession(cliente_path)
+    salida_session = comparador.WorkbookSession(salida_path)
+    try:
+        def detect():
+            comparador._parse_period_text.cache_clear()
+            with comparador.WorkbookSession(cliente_path) as session:
+                return comparator._detect_columns(session, CLIENTE_SHEET)
+
+        results['deteccion'] = _measure(detect, repeat=repeat)
+        config_cliente = results['deteccion'][2]
+        config_salida = comparator._detect_columns(salida_session, SALIDA_SHEET)
+
+        def read_sheet():
+            with comparador.WorkbookSession(cliente_path) as session:
+                return comparator._load_sheet(session, CLIENTE_SHEET, *comparator._sheet_columns(config_cliente))
+
+        # La lectura es la etapa más lenta: con tamaños grandes se mide una sola vez
+        results['lectura'] = _measure(read_sheet, repeat=1 if rows >= 10000 else repeat)
+        df_cliente = comparator._load_sheet(cliente_session, CLIENTE_SHEET, *comparator._sheet_columns(config_cliente))
+        df_salida = comparator._load_sheet(salida_session, SALIDA_SHEET, *comparator._sheet_columns(config_salida))
+
+        results['inicio'] = _measure(
+            lambda: comparator._find_start_row(df_cliente, config_cliente['title_range']), repeat=repeat)
+        start_cliente = results['inicio'][2]
+        start_salida = comparator._find_start_row(df_salida, config_salida['title_range'])
+
+        results['extraccion'] = _measure(
+            lambda: comparator._process_dataframe(df_cliente, start_cliente, config_cliente), repeat=repeat)
+        data_cliente = results['extraccion'][2]
+        data_salida = comparator._process_dataframe(df_salida, start_salida, config_salida)
+
+        def match(cliente_items, salida_items):
+            pares_num = comparator._match_by_key(cliente_items, salida_items, 'num')
+            pares_texto = comparator._match_by_key(cliente_items, salida_items, 'text')
+            return pares_num, pares_texto
+
+        results['coincidencias'] = _measure(
+            match, setup=lambda: (_copy_items(data_cliente), _copy_items(data_salida)), repeat=repeat)
+        pares_num, pares_texto = results['coincidencias'][2]
+
+        def unmatched_copies():
+            cliente_items, salida_items = _copy_items(data_cliente), _copy_items(data_salida)
+            match(cliente_items, salida_items)
+            return cliente_items, salida_items
+
+        results['aproximadas'] = _measure(comparator._match_fuzzy, setup=unmatched_copies, repeat=repeat)
+        pares_aprox, similitudes = results['aproximadas'][2]
+
+        def validate():
+            messages = []
+            comparator._check_matched_pairs("bench", pares_num, messages)
+            comparator._check_matched_pairs("bench", pares_texto, messages, text_match=True)
+            comparator._check_matched_pairs("bench", pares_aprox, messages, similarities=similitudes)
+            return messages
+
+        results['validacion'] = _measure(validate, repeat=repeat)
+
+        def subtotals():
+            messages = []
+            comparator._check_subtotals("bench", 'cliente', data_cliente, comparator._account_tree(data_cliente),
+                                        [item['actual'] for item in data_cliente],
+                                        [item['anterior'] for item in data_cliente], messages)
+            return messages
+
+        results['subtotales'] = _measure(subtotals, repeat=repeat)
+    finally:
+        cliente_session.close()
+        salida_session.close()
+
+    return {stage: {'segundos': round(seconds, 6), 'pico_mb': round(peak_mb, 3)}
+            for stage, (seconds, peak_mb, _) in results.items()}
+
+
+def _print_table(report, baseline=None):
+    base_results = (baseline or {}).get('resultados', {})
+    rows = []
+    for size, stages in report['resultados'].items():
+        for stage in STAGES:
+            measure = stages[stage]
+            base = base_results.get(size, {}).get(stage) or {}
+            rows.append((size, stage, measure['segundos'], measure['pico_mb'],
+                         informe.ratio(measure['segundos'], base.get('segundos'))))
+    informe.print_table([('filas', '>8'), ('etapa', '<14'), ('segundos', '>9.4f'), ('pico MB', '>8.2f'),
+                         ('vs base', '>8')], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapa de ExcelComparator.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Cantidades de cuentas (filas) a medir.")
+    parser.add_argument('--repeat', type=int, default=3, help="Corridas por etapa (se informa la mejor).")
+    parser.add_argument('--work-dir', default=os.path.join('benchmarks', 'libros'),
+                        help="Directorio de los libros generados (se reutilizan).")
+    parser.add_argument('--seed', type=int, default=0)
+    informe.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    report = {
+        'python': platform.python_version(),
+        'pandas': comparador.pd.__version__,
+        'numpy': comparador.np.__version__,
+        'repeat': args.repeat,
+        'resultados': {},
+    }
+    for rows in args.sizes:
+        print(f"Midiendo {rows} filas...")
+        report['resultados'][str(rows)] = bench_size(rows, args.work_dir, repeat=args.repeat, seed=args.seed)
+
+    return informe.finish(report, args, _print_table)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Generador de pares de libros Excel (cliente/salida) sintéticos, con la forma
+de los estados financieros que procesa ExcelComparator:
+
+  - Títulos de cuenta numerados ("1.2.3 Caja") con la profundidad pedida.
+  - Encabezado de período en una columna D-L, en distintos formatos
+    (fecha, dd/mm/aaaa, ISO o rango 'aaaa-mm-dd - aaaa-mm-dd').
+  - Columna de títulos desplazada (A-F), distinta en cliente y salida.
+  - Salida en miles (x1000), con discrepancias, faltantes, sobrantes y
+    renumeraciones (coincidencia por texto) inyectadas.
+  - Filas basura al final del estado (notas, totales sin número, etc.).
+
+Los libros respetan el sheet_map por defecto de ExcelComparator: cliente
+con los estados en las hojas 3-5 y salida en las hojas 2-4.
+
+Uso:
+    python benchmarks/generar_libros.py --accounts 10000 --out-dir libros
+"""
+import os
+import sys
+import random
+import argparse
+import datetime
+
+from openpyxl import Workbook
+
+DATE_FORMATS = ('fecha', 'dmy', 'iso', 'rango')
+
+STATEMENT_NAMES = ('ESP', 'ER', 'EEPN')
+
+ACCOUNT_NAMES = ('Caja', 'Bancos', 'Inversiones', 'Deudores por ventas', 'Otros créditos', 'Bienes de cambio',
+                 'Bienes de uso', 'Activos intangibles', 'Proveedores', 'Préstamos', 'Remuneraciones',
+                 'Cargas fiscales', 'Previsiones', 'Capital social', 'Resultados no asignados', 'Ventas',
+                 'Costo de ventas', 'Gastos de administración', 'Gastos de comercialización',
+                 'Resultados financieros')
+
+JUNK_LINES = ('Las notas forman parte de los estados contables', 'Total del estado', 'Firmado a efectos de su identificación',
+              'Véase nuestro informe', None, 'Contador Público (U.B.A.)')
+
+
+def _last_day(year, month):
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return next_month - datetime.timedelta(days=1)
+
+
+def _period_header(date, date_format):
+    """Encabezado de período para `date` en el formato pedido."""
+    if date_format == 'fecha':
+        return datetime.datetime(date.year, date.month, date.day)
+    if date_format == 'dmy':
+        return date.strftime('%d/%m/%Y')
+    if date_format == 'iso':
+        return date.isoformat()
+    if date_format == 'rango':
+        return f"{date.year}-01-01 - {date.isoformat()}"
+    raise ValueError(f"Formato de fecha inválido: '{date_format}'. Use uno de {', '.join(DATE_FORMATS)}.")
+
+
+def account_codes(accounts, depth):
+    """
+    Primeros `accounts` números de cuenta en orden jerárquico (padre antes
+    que sus hijos), con hasta `depth` niveles: '1', '1.1', '1.1.1', ...
+    """
+    depth = max(1, depth)
+    # Ramas por nivel: las justas para llegar a `accounts` cuentas
+    branching = 2
+    while sum(branching ** level for level in range(1, depth + 1)) < accounts:
+        branching += 1
+
+    codes = []
+
+    def walk(prefix, level):
+        for child in range(1, branching + 1):
+            if len(codes) >= accounts:
+                return
+            code = f"{prefix}.{child}" if prefix else str(child)
+            codes.append(code)
+            if level < depth:
+                walk(code, level + 1)
+
+    walk('', 1)
+    return codes
+
+
+def generate_pair(cliente_path, salida_path, accounts=1000, depth=3, year=2024, month=6,
+                  date_format='fecha', period_col=3, cliente_title_col=0, salida_title_col=1,
+                  discrepancy_rate=0.02, missing_rate=0.01, extra_rate=0.01, renumber_rate=0.02,
+                  junk_rows=20, statements=3, seed=0):
+    """
+    Escribe un par de libros cliente/salida y devuelve un resumen con lo
+    inyectado ('discrepancias', 'faltantes', 'sobrantes', 'renumeradas').
+
+    `period_col` (0-based, D=3 ... K=10) es la columna del período actual;
+    el anterior va a la derecha. `*_title_col` (0-5) es la columna de los
+    títulos de cada archivo. `statements` (1-3) es la cantidad de estados.
+    """
+    if not 3 <= period_col <= 10:
+        raise ValueError("period_col debe estar entre 3 (D) y 10 (K).")
+    if not (0 <= cliente_title_col <= 5 and 0 <= salida_title_col <= 5):
+        raise ValueError("Las columnas de títulos deben estar entre 0 (A) y 5 (F).")
+    if max(cliente_title_col, salida_title_col) >= period_col:
+        raise ValueError("Las columnas de títulos deben quedar a la izquierda del período.")
+
+    rng = random.Random(seed)
+    current = _last_day(year, month)
+    previous = _last_day(year - 1, 12)
+
+    cliente_book = Workbook(write_only=True)
+    salida_book = Workbook(write_only=True)
+    # Hojas de relleno antes de los estados (sheet_map por defecto: (2,1),(3,2),(4,3))
+    for name in ('Portada', 'Indice'):
+        cliente_book.create_sheet(name).append(["Estados contables sintéticos"])
+    salida_book.create_sheet('Portada').append(["Estados contables sintéticos"])
+
+    summary = {'discrepancias': 0, 'faltantes': 0, 'sobrantes': 0, 'renumeradas': 0}
+    codes = account_codes(accounts, depth)
+
+    for statement in STATEMENT_NAMES[:max(1, min(statements, len(STATEMENT_NAMES)))]:
+        cliente_sheet = cliente_book.create_sheet(statement)
+        salida_sheet = salida_book.create_sheet(statement)
+
+        for sheet, title_col in ((cliente_sheet, cliente_title_col), (salida_sheet, salida_title_col)):
+            sheet.append(["Empresa Sintética S.A."])
+            sheet.append([f"Estado {statement}"])
+            sheet.append([])
+            header = [None] * (period_col + 2)
+            header[title_col] = "Cuenta"
+            header[period_col] = _period_header(current, date_format)
+            header[period_col + 1] = _period_header(previous, date_format)
+            sheet.append(header)
+            sheet.append([])
+
+        for code in codes:
+            name = f"{rng.choice(ACCOUNT_NAMES)} {code}"
+            actual = rng.choice((0, None, round(rng.uniform(-5e6, 5e6), 2)))
+            anterior = rng.choice((0, round(rng.uniform(-5e6, 5e6), 2)))
+
+            row = [None] * (period_col + 2)
+            row[cliente_title_col] = f"{code} {name}"
+            row[period_col] = actual
+            row[period_col + 1] = anterior
+            cliente_sheet.append(row)
+
+            roll = rng.random()
+            if roll < missing_rate:
+                if actual or anterior:
+                    summary['faltantes'] += 1
+                continue
+
+            salida_code = code
+            if roll < missing_rate + renumber_rate:
+                salida_code = f"{code}.0"
+                summary['renumeradas'] += 1
+
+            salida_actual = round(actual * 1000) if actual is not None else None
+            salida_anterior = round(anterior * 1000)
+            if rng.random() < discrepancy_rate:
+                salida_actual = (salida_actual or 0) + rng.choice((2000, -5000, 1_000_000))
+                summary['discrepancias'] += 1
+
+            row = [None] * (period_col + 2)
+            row[salida_title_col] = f"{salida_code} {name}"
+            row[period_col] = salida_actual
+            row[period_col + 1] = salida_anterior
+            salida_sheet.append(row)
+
+            if rng.random() < extra_rate:
+                row = [None] * (period_col + 2)
+                row[salida_title_col] = f"{code}.99 Cuenta adicional"
+                row[period_col] = round(rng.uniform(1, 5e6)) * 1000
+                salida_sheet.append(row)
+                summary['sobrantes'] += 1
+
+        # Filas basura al pie: huecos, textos y hasta títulos fuera del bloque
+        for sheet, title_col in ((cliente_sheet, cliente_title_col), (salida_sheet, salida_title_col)):
+            for _ in range(5):
+                sheet.append([])
+            for junk in range(junk_rows):
+                row = [None] * (period_col + 2)
+                if junk % 7 == 6:
+                    row[title_col] = f"{len(codes) + junk}.1 Nota fuera del estado"
+                    row[period_col] = junk
+                else:
+                    row[0] = JUNK_LINES[junk % len(JUNK_LINES)]
+                sheet.append(row)
+
+    for path, book in ((cliente_path, cliente_book), (salida_path, salida_book)):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        book.save(path)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un par de libros cliente/salida sintéticos.")
+    parser.add_argument('--accounts', type=int, default=1000, help="Cuentas por estado.")
+    parser.add_argument('--depth', type=int, default=3, help="Niveles de numeración (ej: 3 -> '1.2.3').")
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--month', type=int, default=6)
+    parser.add_argument('--date-format', choices=DATE_FORMATS, default='fecha')
+    parser.add_argument('--period-col', type=int, default=3, help="Columna del período actual, 0-based (D=3).")
+    parser.add_argument('--cliente-title-col', type=int, default=0)
+    parser.add_argument('--salida-title-col', type=int, default=1)
+    parser.add_argument('--discrepancy-rate', type=float, default=0.02)
+    parser.add_argument('--missing-rate', type=float, default=0.01)
+    parser.add_argument('--extra-rate', type=float, default=0.01)
+    parser.add_argument('--renumber-rate', type=float, default=0.02)
+    parser.add_argument('--junk-rows', type=int, default=20)
+    parser.add_argument('--statements', type=int, default=3, help="Cantidad de estados (1-3).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', default='.', help="Directorio de salida.")
+    parser.add_argument('--name', default='sintetico', help="Prefijo de los archivos.")
+    args = parser.parse_args(argv)
+
+    cliente_path = os.path.join(args.out_dir, f"{args.name}_cliente.xlsx")
+    salida_path = os.path.join(args.out_dir, f"{args.name}_salida.xlsx")
+    summary = generate_pair(cliente_path, salida_path, accounts=args.accounts, depth=args.depth,
+                            year=args.year, month=args.month, date_format=args.date_format,
+                            period_col=args.period_col, cliente_title_col=args.cliente_title_col,
+                            salida_title_col=args.salida_title_col, discrepancy_rate=args.discrepancy_rate,
+                            missing_rate=args.missing_rate, extra_rate=args.extra_rate,
+                            renumber_rate=args.renumber_rate, junk_rows=args.junk_rows,
+                            statements=args.statements, seed=args.seed)
+    print(f"Generados: {cliente_path}, {salida_path}")
+    print("Inyectado (todos los estados): " + ", ".join(f"{key}={value}" for key, value in summary.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
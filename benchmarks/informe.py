@@ -0,0 +1,54 @@
+"""
+Salida común de los benchmarks: la tabla de resultados y las opciones
+--json (guarda la corrida) y --baseline (compara contra una corrida previa).
+"""
+import re
+import json
+
+
+def add_arguments(parser):
+    """Agrega --json y --baseline al parser del benchmark."""
+    parser.add_argument('--json', dest='json_path', default=None, help="Guarda los resultados en este JSON.")
+    parser.add_argument('--baseline', default=None, help="JSON de una corrida previa para comparar tiempos.")
+
+
+def ratio(seconds, base_seconds):
+    """'x1.23' respecto de la corrida base ('' si no hay base o es 0)."""
+    if not base_seconds:
+        return ''
+    return f"x{seconds / base_seconds:.2f}"
+
+
+def _alignment(spec):
+    # '>11.4f' -> '>11': el encabezado y los textos ('-') solo usan alineación y ancho
+    return re.match(r'[<>^]?\d*', spec).group()
+
+
+def print_table(columns, rows):
+    """
+    Imprime una tabla de columnas [(título, formato)], ej. ('segundos', '>9.4f').
+    Los valores de texto de cualquier columna se alinean sin aplicar el formato.
+    """
+    print("\n" + "  ".join(f"{title:{_alignment(spec)}}" for title, spec in columns).rstrip())
+    for row in rows:
+        cells = [f"{value:{_alignment(spec) if isinstance(value, str) else spec}}"
+                 for value, (_, spec) in zip(row, columns)]
+        print("  ".join(cells).rstrip())
+
+
+def finish(report, args, print_report):
+    """
+    Cierre de main(): imprime `report` con print_report(report, baseline)
+    (baseline es el JSON de --baseline o None) y lo guarda en --json.
+    """
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(report, json_file, indent=2)
+        print(f"\nResultados: {args.json_path}")
+    return 0
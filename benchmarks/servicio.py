@@ -0,0 +1,119 @@
+"""
+Latencia por comparación con y sin el servicio local (--serve), sobre un
+par de libros sintéticos (generar_libros.py):
+
+  linea_de_comandos   proceso nuevo con --batch de un solo par (intérprete,
+                      pandas, lectura de los libros y comparación)
+  servicio_primera    primer pedido POST /comparar al servicio (procesos ya
+                      iniciados, hojas todavía sin caché)
+  servicio_repetida   pedidos siguientes sobre los mismos archivos sin
+                      cambios (hojas desde el caché del proceso)
+
+El servicio se levanta en un proceso aparte, en un puerto libre, y se
+cierra al terminar. Para cada medición informa el mejor de `--repeat`.
+
+Uso:
+    python benchmarks/servicio.py --accounts 5000 --json servicio.json
+    python benchmarks/servicio.py --baseline servicio.json   # compara contra una corrida previa
+"""
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import informe  # noqa: E402
+from generar_libros import generate_pair  # noqa: E402
+
+SCRIPT = os.path.join(ROOT, 'ComparadorEstadosFinancieros.py')
+YEAR, MONTH = 2024, 6
+MEASURES = ('linea_de_comandos', 'servicio_primera', 'servicio_repetida')
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _cli_seconds(pair_dir, output_dir):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, SCRIPT, '--batch', pair_dir, '--year', str(YEAR), '--month', str(MONTH),
+                    '--workers', '1', '--output-dir', output_dir], check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def measure(accounts=5000, repeat=3, work_dir=None):
+    """{medición: segundos} (mejor de `repeat`) para un par de `accounts` cuentas."""
+    work_dir = work_dir or tempfile.mkdtemp(prefix='bench_servicio_')
+    pair_dir = os.path.join(work_dir, f"par_{accounts}")
+    cliente_path = os.path.join(pair_dir, 'bench_cliente.xlsx')
+    salida_path = os.path.join(pair_dir, 'bench_salida.xlsx')
+    if not (os.path.exists(cliente_path) and os.path.exists(salida_path)):
+        print(f"  Generando libros de {accounts} cuentas...")
+        generate_pair(cliente_path, salida_path, accounts=accounts, year=YEAR, month=MONTH)
+
+    results = {'linea_de_comandos': min(_cli_seconds(pair_dir, os.path.join(work_dir, 'resultados'))
+                                        for _ in range(max(1, repeat)))}
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, SCRIPT, '--serve', '--port', str(port), '--workers', '1'],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        server.stdout.readline()  # "Servicio de comparación en ..." (ya escuchando)
+        url = f"http://127.0.0.1:{port}/comparar"
+        payload = {'cliente': cliente_path, 'salida': salida_path, 'year': YEAR, 'month': MONTH}
+        for measure_name in ('servicio_primera', 'servicio_repetida'):
+            started = time.perf_counter()
+            _post(url, payload)
+            results[measure_name] = time.perf_counter() - started
+        for _ in range(max(1, repeat) - 1):
+            started = time.perf_counter()
+            _post(url, payload)
+            results['servicio_repetida'] = min(results['servicio_repetida'], time.perf_counter() - started)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def _print_table(report, baseline=None):
+    base_results = (baseline or {}).get('resultados', {})
+    rows = [(measure_name, report['resultados'][measure_name],
+             informe.ratio(report['resultados'][measure_name], base_results.get(measure_name)))
+            for measure_name in MEASURES]
+    informe.print_table([('medición', '<20'), ('segundos', '>9.4f'), ('vs base', '>8')], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia por comparación: línea de comandos vs servicio local.")
+    parser.add_argument('--accounts', type=int, default=5000, help="Cuentas por estado del par sintético.")
+    parser.add_argument('--repeat', type=int, default=3, help="Corridas por medición (se informa la mejor).")
+    parser.add_argument('--work-dir', default=None,
+                        help="Directorio de los libros generados (por defecto, uno temporal).")
+    informe.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = {'python': platform.python_version(), 'accounts': args.accounts, 'repeat': args.repeat,
+              'resultados': {name: round(seconds, 6)
+                             for name, seconds in measure(args.accounts, args.repeat, args.work_dir).items()}}
+    return informe.finish(report, args, _print_table)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
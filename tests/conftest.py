@@ -0,0 +1,73 @@
+import datetime
+import os
+import random
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+YEAR, MONTH = 2024, 6
+
+
+def write_pair(cliente_path, salida_path, accounts=60, seed=1):
+    """
+    Par cliente/salida chico con la forma del sheet_map por defecto: cliente
+    con los estados en las hojas 3-5 (títulos en A) y salida en las hojas
+    2-4 (títulos en B), Actual en D y Anterior en E. Salida va en miles, con
+    algunas diferencias, faltantes, sobrantes y renumeradas.
+    """
+    rng = random.Random(seed)
+    books = {'cliente': Workbook(write_only=True), 'salida': Workbook(write_only=True)}
+    for name in ('Portada', 'Indice'):
+        books['cliente'].create_sheet(name).append(['Estados contables'])
+    books['salida'].create_sheet('Portada').append(['Estados contables'])
+
+    for statement in ('ESP', 'ER', 'EEPN'):
+        rows = {'cliente': [], 'salida': []}
+        for pos in range(accounts):
+            code, name = f"{pos // 4 + 1}.{pos % 4 + 1}", f"Cuenta {statement} {pos}"
+            actual = rng.choice((0, None, round(rng.uniform(-1e6, 1e6), 2)))
+            anterior = round(rng.uniform(-1e6, 1e6), 2)
+            rows['cliente'].append((f"{code} {name}", actual, anterior))
+
+            roll = rng.random()
+            if roll < 0.05:
+                continue  # Falta en Salida
+            salida_code = f"{code}.0" if roll < 0.1 else code  # Coincide por texto
+            salida_actual = round(actual * 1000) if actual is not None else None
+            if roll > 0.9:
+                salida_actual = (salida_actual or 0) + 5_000_000
+            rows['salida'].append((f"{salida_code} {name}", salida_actual, round(anterior * 1000)))
+            if roll > 0.95:
+                rows['salida'].append((f"{code}.9 Sobrante {pos}", 7000, None))
+
+        for side, title_col in (('cliente', 0), ('salida', 1)):
+            sheet = books[side].create_sheet(statement)
+            sheet.append([f"Estado {statement}"])
+            header = [None] * 5
+            header[title_col] = 'Cuenta'
+            header[3], header[4] = datetime.datetime(YEAR, MONTH, 30), datetime.datetime(YEAR - 1, 12, 31)
+            sheet.append(header)
+            for title, actual, anterior in rows[side]:
+                row = [None] * 5
+                row[title_col], row[3], row[4] = title, actual, anterior
+                sheet.append(row)
+            for _ in range(5):
+                sheet.append([])
+            sheet.append(['Las notas forman parte de los estados contables'])
+
+    for side, path in (('cliente', cliente_path), ('salida', salida_path)):
+        books[side].save(path)
+
+
+@pytest.fixture(scope='session')
+def libros(tmp_path_factory):
+    """Par cliente/salida sintético (ver write_pair), compartido por los tests."""
+    directory = tmp_path_factory.mktemp('libros')
+    cliente_path = str(directory / 'par_cliente.xlsx')
+    salida_path = str(directory / 'par_salida.xlsx')
+    write_pair(cliente_path, salida_path)
+    return cliente_path, salida_path
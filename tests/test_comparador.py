@@ -0,0 +1,482 @@
+import copy
+import datetime
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import ComparadorEstadosFinancieros as comparador
+from conftest import ROOT, YEAR, MONTH
+
+
+def _iterrows_start_row(comparator, df, col_range_str):
+    """_find_start_row original (fila por fila): referencia de la versión columnar."""
+    col_indices = comparator._parse_col_range(col_range_str)
+    num_cols = len(df.columns)
+    for index, row in df.iterrows():
+        for col_idx in col_indices:
+            if col_idx < num_cols and comparator._normalize_title(row.iloc[col_idx]) is not None:
+                return index
+    return None
+
+
+def _iterrows_process(comparator, df, start_row, config):
+    """_process_dataframe original (fila por fila): referencia de la versión columnar."""
+    title_col_indices = comparator._parse_col_range(config['title_range'])
+    actual_col_idx = comparator._col_to_int(config['actual_col'])
+    anterior_col_idx = comparator._col_to_int(config['anterior_col'])
+    num_cols = len(df.columns)
+    data_list = []
+    for index, row in df.iloc[start_row:].iterrows():
+        for col_idx in title_col_indices:
+            if col_idx >= num_cols:
+                continue
+            title_parts = comparator._normalize_title(row.iloc[col_idx])
+            if title_parts:
+                data_list.append({
+                    'num': title_parts[0], 'text': title_parts[1], 'full_title': row.iloc[col_idx].strip(),
+                    'actual': pd.to_numeric(row.iloc[actual_col_idx], errors='coerce'),
+                    'anterior': pd.to_numeric(row.iloc[anterior_col_idx], errors='coerce'),
+                    'matched': False, 'row_num': index + 1})
+                break
+    return data_list
+
+
+def _comparable(data_list):
+    return [{key: 'NaN' if isinstance(value, float) and np.isnan(value) else value for key, value in item.items()}
+            for item in data_list]
+
+
+CELLS = (None, 0, 15, -2.5, 1e6, '1000', '', 'Total del estado', 'Nota 5', '1.2', '12 ',
+         '1.2 Caja', '  3 Bancos ', '4.1.2 Otros Créditos', datetime.datetime(2024, 6, 30))
+
+
+def _random_sheet(rng, rows, cols):
+    columns = {}
+    for col_idx in range(cols):
+        kind = rng.choice(('mixta', 'mixta', 'vacia', 'numeros', 'sin_texto'))
+        if kind == 'vacia':
+            columns[col_idx] = pd.Series([None] * rows, dtype=object)
+        elif kind == 'numeros':
+            columns[col_idx] = pd.Series([rng.choice((np.nan, 1.5, -3.0, 1e6)) for _ in range(rows)], dtype=float)
+        elif kind == 'sin_texto':
+            values = (None, 7, datetime.datetime(2023, 12, 31))
+            columns[col_idx] = pd.Series([rng.choice(values) for _ in range(rows)], dtype=object)
+        else:
+            columns[col_idx] = pd.Series([rng.choice(CELLS) for _ in range(rows)], dtype=object)
+    return pd.DataFrame(columns)
+
+
+@pytest.fixture
+def comparator():
+    return comparador.ExcelComparator('cliente.xlsx', 'salida.xlsx', 2024, 6)
+
+
+def test_title_column_without_text(comparator):
+    # Columna object sin ninguna celda de texto dentro del rango de títulos
+    df = pd.DataFrame({0: pd.Series([None, 7, datetime.datetime(2024, 6, 30), None], dtype=object),
+                       1: pd.Series([None, 'Estado', '1 Caja', '2 Bancos'], dtype=object),
+                       2: [np.nan, np.nan, 10.0, 20.0], 3: [np.nan, np.nan, 1.0, 2.0]})
+    assert comparator._find_start_row(df, 'A:B') == 2
+    config = {'title_range': 'A:B', 'actual_col': 'C', 'anterior_col': 'D'}
+    assert [item['full_title'] for item in comparator._process_dataframe(df, 2, config)] == ['1 Caja', '2 Bancos']
+
+
+def test_columnar_extraction_matches_iterrows(comparator):
+    rng = random.Random(0)
+    for _ in range(300):
+        cols = rng.randint(3, 8)
+        df = _random_sheet(rng, rng.randint(1, 40), cols)
+        first = rng.randrange(cols)
+        title_range = f"{comparator._int_to_col(first)}:{comparator._int_to_col(rng.randrange(first, first + 3))}"
+        actual = rng.randrange(cols - 1)
+        config = {'title_range': title_range, 'actual_col': comparator._int_to_col(actual),
+                  'anterior_col': comparator._int_to_col(actual + 1)}
+
+        start_row = _iterrows_start_row(comparator, df, title_range)
+        assert comparator._find_start_row(df, title_range) == start_row
+        if start_row is not None:
+            assert _comparable(comparator._process_dataframe(df, start_row, config)) == \
+                _comparable(_iterrows_process(comparator, df, start_row, config))
+
+
+def _nested_scan(data_cliente, data_salida, key):
+    """Coincidencia original (recorrido completo de Salida por cada item de Cliente)."""
+    pares = []
+    for cliente_item in data_cliente:
+        if cliente_item['matched']:
+            continue
+        for salida_item in data_salida:
+            if not salida_item['matched'] and cliente_item[key] == salida_item[key]:
+                cliente_item['matched'] = salida_item['matched'] = True
+                pares.append((cliente_item, salida_item))
+                break
+    return pares
+
+
+def _random_items(rng, count):
+    return [{'num': rng.choice(('1', '1.1', '1.2', '2', '2.1', '3')), 'text': rng.choice(('caja', 'bancos', 'ventas')),
+             'matched': False, 'pos': pos} for pos in range(count)]
+
+
+def test_index_matching_matches_nested_scan(comparator):
+    rng = random.Random(0)
+    for _ in range(300):
+        data_cliente, data_salida = _random_items(rng, rng.randint(0, 12)), _random_items(rng, rng.randint(0, 12))
+        expected_cliente, expected_salida = copy.deepcopy(data_cliente), copy.deepcopy(data_salida)
+        for key in ('num', 'text'):
+            pares = comparator._match_by_key(data_cliente, data_salida, key)
+            expected = _nested_scan(expected_cliente, expected_salida, key)
+            assert [(c['pos'], s['pos']) for c, s in pares] == [(c['pos'], s['pos']) for c, s in expected]
+        assert data_cliente == expected_cliente and data_salida == expected_salida
+
+
+def _scalar_check(context, title, cliente_val, salida_val):
+    """_check_values original (un par por vez): mensaje o None."""
+    cliente_val = cliente_val if pd.notna(cliente_val) else 0
+    salida_val = salida_val if pd.notna(salida_val) else 0
+    abs_salida_scaled = abs(int(round(salida_val / 1000.0)))
+    abs_cliente_val = abs(int(round(cliente_val)))
+    if abs_cliente_val == 0:
+        if abs_salida_scaled != 0:
+            return f"[{context}] '{title}': Cliente es 0, pero Salida reporta valor (Escalado: {abs_salida_scaled})."
+        return None
+    if abs_cliente_val != abs_salida_scaled:
+        return f"[{context}] '{title}': DISCREPANCIA . Cliente: {abs_cliente_val}, Salida (Escalado): {abs_salida_scaled}."
+    return None
+
+
+def test_batch_value_checks_match_scalar_rules(comparator):
+    rng = random.Random(0)
+    # Bordes del redondeo (al par), ceros, vacíos, signos y la escala x1000
+    special = (np.nan, 0, 0.4, 0.5, 1.5, -2.5, 499.999, 500, 1500, -1500, 2500.0, 1e6, 123456.78)
+    cliente_vals, salida_vals = [], []
+    for _ in range(3000):
+        cliente = rng.choice(special + (rng.uniform(-1e4, 1e4),))
+        cliente_vals.append(cliente)
+        scaled = cliente * 1000 + rng.choice((0, 0, 499.9, 500, -500, 1500)) if pd.notna(cliente) else 0
+        salida_vals.append(rng.choice(special + (scaled, rng.uniform(-1e7, 1e7))))
+    titles = [f"{pos} Cuenta {pos}" for pos in range(len(cliente_vals))]
+
+    expected = {}
+    for pos, (title, cliente, salida) in enumerate(zip(titles, cliente_vals, salida_vals)):
+        message = _scalar_check('Hoja [Actual]', title, cliente, salida)
+        if message:
+            expected[pos] = message
+    findings = comparator._check_values_batch('Hoja [Actual]', titles, cliente_vals, salida_vals)
+    assert {pos: finding.render() for pos, finding in findings.items()} == expected
+
+
+@pytest.mark.parametrize('parallel', ['thread', 'process'])
+def test_parallel_modes_match_serial(libros, parallel):
+    expected = comparador.ExcelComparator(*libros, YEAR, MONTH).compare()
+    assert 'DISCREPANCIA' in expected and 'FALTA en Salida' in expected and 'Coincidencia por TEXTO' in expected
+    assert comparador.ExcelComparator(*libros, YEAR, MONTH, parallel=parallel).compare() == expected
+
+
+@pytest.mark.parametrize('parallel', [None, 'thread', 'process'])
+def test_pair_errors_raise_in_every_mode(libros, parallel):
+    # Diciembre está en la columna E: su Anterior (F) queda fuera de la hoja
+    comparator = comparador.ExcelComparator(*libros, YEAR - 1, 12, parallel=parallel)
+    with pytest.raises(IndexError, match='CONFIGURACIÓN INVÁLIDA'):
+        comparator.compare()
+
+
+def test_corrupt_cache_entry_is_reparsed_and_replaced(libros, tmp_path):
+    expected = comparador.ExcelComparator(*libros, YEAR, MONTH).compare()
+    cache = comparador.SheetCache(cache_dir=str(tmp_path))
+    assert comparador.ExcelComparator(*libros, YEAR, MONTH, cache=cache).compare() == expected
+
+    sizes = {entry: entry.stat().st_size for entry in tmp_path.glob('*.npz')}
+    assert len(sizes) == 6
+    for entry, size in sizes.items():
+        entry.write_bytes(entry.read_bytes()[:size // 2])  # Truncada: ya no es un zip válido
+    assert comparador.ExcelComparator(*libros, YEAR, MONTH, cache=cache).compare() == expected
+    # Las entradas ilegibles se borraron y se volvieron a escribir completas
+    for entry, size in sizes.items():
+        assert entry.stat().st_size == size
+        with np.load(entry, allow_pickle=False) as arrays:
+            assert 'meta' in arrays.files
+
+
+def test_thread_mode_reports_stages_and_stops_on_cancel(libros):
+    events = []
+    comparator = None
+
+    def on_progress(event, **details):
+        events.append((event, details.get('stage')))
+        if details.get('stage') == 'extraccion' and not comparator._cancel_event.is_set():
+            # Una etapa lenta en curso al cancelar
+            comparator.cancel()
+            time.sleep(0.5)
+            events.append(('etapa_lenta_terminada', None))
+
+    comparator = comparador.ExcelComparator(*libros, YEAR, MONTH, parallel='thread', progress_callback=on_progress)
+    with pytest.raises(comparador.ComparisonCancelled):
+        comparator.compare()
+
+    stages = {stage for event, stage in events if event == 'stage'}
+    assert {'apertura', 'deteccion', 'extraccion'} <= stages
+    assert ('etapa_lenta_terminada', None) in events
+    # Los hilos ya terminaron: no llegan más eventos después de compare()
+    seen = len(events)
+    time.sleep(0.3)
+    assert len(events) == seen
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('ThreadPoolExecutor')]
+
+
+def test_compare_periods_matches_compare_per_period(libros):
+    reports = comparador.ExcelComparator(*libros, YEAR, MONTH).compare_periods([(YEAR, MONTH), (YEAR - 1, 12)])
+    assert list(reports) == [(YEAR, MONTH), (YEAR - 1, 12)]
+    assert reports[(YEAR, MONTH)] == comparador.ExcelComparator(*libros, YEAR, MONTH).compare()
+
+    # compare() corta diciembre con un IndexError; compare_periods lo informa una vez por hoja
+    with pytest.raises(IndexError) as excinfo:
+        comparador.ExcelComparator(*libros, YEAR - 1, 12).compare()
+    december = reports[(YEAR - 1, 12)]
+    assert december.count('CONFIGURACIÓN INVÁLIDA') == 3
+    assert december.count(str(excinfo.value)) == 3
+
+
+def _declare_dimension(src, dst, ref):
+    """Copia el libro declarando <dimension ref=...> en cada hoja (como algunos generadores)."""
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename.startswith('xl/worksheets/sheet'):
+                data = re.sub(rb'<dimension ref="[^"]*"\s*/>', b'', data)
+                data = data.replace(b'<sheetViews>', b'<dimension ref="%s"/><sheetViews>' % ref.encode(), 1)
+            zout.writestr(item, data)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_declared_dimension_is_ignored(libros, tmp_path, streaming):
+    cliente_path, salida_path = libros
+    cliente_a1 = str(tmp_path / 'cliente_a1.xlsx')
+    salida_a1 = str(tmp_path / 'salida_a1.xlsx')
+    _declare_dimension(cliente_path, cliente_a1, 'A1')
+    _declare_dimension(salida_path, salida_a1, 'A1')
+
+    expected = comparador.ExcelComparator(cliente_path, salida_path, YEAR, MONTH, streaming=streaming).compare()
+    report = comparador.ExcelComparator(cliente_a1, salida_a1, YEAR, MONTH, streaming=streaming).compare()
+    assert report == expected
+
+
+
+
+def test_projected_without_row_access_parses_sheet_once(libros, monkeypatch):
+    # Sin lectura por filas (.xls) cada proyección sale de la hoja completa
+    monkeypatch.setattr(comparador.WorkbookSession, 'row_access', property(lambda self: False))
+    with comparador.WorkbookSession(libros[0]) as session:
+        excel = session.open()
+        parse = excel.parse
+        calls = []
+        monkeypatch.setattr(excel, 'parse', lambda *args, **kwargs: calls.append(kwargs) or parse(*args, **kwargs))
+        first = session.projected(2, [0], [3])
+        second = session.projected(2, [0, 1], [3, 4])
+    assert len(calls) == 1
+    assert second[3].equals(first[3])
+
+
+def _edit_workbook(path, rng):
+    """Algunas ediciones al azar en un estado del libro: importes, títulos, filas nuevas y borradas."""
+    book = openpyxl.load_workbook(path)
+    sheet = book[rng.choice(('ESP', 'ER', 'EEPN'))]
+    title_col = 1 if sheet.cell(row=2, column=1).value == 'Cuenta' else 2
+
+    def account_rows():
+        return [row for row in range(3, sheet.max_row + 1)
+                if str(sheet.cell(row=row, column=title_col).value or '')[:1].isdigit()]
+
+    for _ in range(3):
+        row = rng.choice(account_rows())
+        edit = rng.choice(('importe', 'titulo', 'insertar', 'borrar'))
+        if edit == 'importe':
+            sheet.cell(row=row, column=rng.choice((4, 5)), value=rng.choice((0, None, rng.randint(-10**6, 10**6))))
+        elif edit == 'titulo':
+            code, name = sheet.cell(row=row, column=title_col).value.split(' ', 1)
+            sheet.cell(row=row, column=title_col, value=rng.choice((f"{code}.0 {name}", f"{code} {name} bis")))
+        elif edit == 'insertar':
+            sheet.insert_rows(row)
+            sheet.cell(row=row, column=title_col, value=f"{rng.randint(1, 20)}.{rng.randint(1, 4)} Cuenta nueva")
+            sheet.cell(row=row, column=4, value=rng.randint(-1000, 1000))
+        else:
+            sheet.delete_rows(row)
+    book.save(path)
+    # El caché identifica el archivo por (ruta, mtime, tamaño) antes de hashearlo
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_incremental_comparator_matches_fresh_compare(libros, tmp_path):
+    cliente_path, salida_path = str(tmp_path / 'cliente.xlsx'), str(tmp_path / 'salida.xlsx')
+    shutil.copy(libros[0], cliente_path)
+    shutil.copy(libros[1], salida_path)
+    rng = random.Random(3)
+
+    incremental = comparador.IncrementalComparator(cliente_path, salida_path, YEAR, MONTH)
+    assert incremental.compare() == comparador.ExcelComparator(cliente_path, salida_path, YEAR, MONTH).compare()
+    for _ in range(6):
+        _edit_workbook(rng.choice((cliente_path, salida_path)), rng)
+        report = incremental.compare()
+        assert report == comparador.ExcelComparator(cliente_path, salida_path, YEAR, MONTH).compare()
+    # Después de la primera corrida solo se vuelven a procesar los grupos tocados
+    assert incremental.recomputed < 60 * 3 * 2
+
+
+CACHED_RUN = f"""
+import sys
+import ComparadorEstadosFinancieros as comparador
+cache = comparador.SheetCache(sys.argv[3])
+hits = []
+load = cache.load
+cache.load = lambda *args: hits.append(load(*args)) or hits[-1]
+comparator = comparador.ExcelComparator(sys.argv[1], sys.argv[2], {YEAR}, {MONTH}, cache=cache)
+print(comparator.compare())
+print('aciertos', sum(entry is not None for entry in hits))
+"""
+
+
+def test_sheet_cache_in_fresh_interpreter(libros, tmp_path):
+    # Proceso nuevo con el caché ya poblado: np.load es lo primero que toca numpy
+    cache_dir = str(tmp_path / 'cache')
+    runs = [subprocess.run([sys.executable, '-c', CACHED_RUN, *libros, cache_dir], cwd=ROOT,
+                           capture_output=True, text=True, timeout=120)
+            for _ in range(2)]
+    for run in runs:
+        assert run.returncode == 0, run.stderr
+    (first_report, first_hits), (second_report, second_hits) = (run.stdout.rsplit('aciertos', 1) for run in runs)
+    # Las 6 hojas (3 pares) salen del caché en la segunda corrida
+    assert int(first_hits) == 0 and int(second_hits) == 6
+    assert second_report == first_report
+
+
+def _all_pairs_fuzzy(data_cliente, data_salida, threshold):
+    """_match_fuzzy sin índice: cada título de Cliente contra todos los de Salida."""
+    pares, similitudes = [], []
+    for cliente_item in data_cliente:
+        if cliente_item['matched']:
+            continue
+        grams = comparador._trigrams(comparador._fuzzy_text(cliente_item['text']))
+        best, best_similarity = None, 0.0
+        for salida_item in data_salida:
+            if salida_item['matched']:
+                continue
+            salida_grams = comparador._trigrams(comparador._fuzzy_text(salida_item['text']))
+            similarity = 1.0 if grams == salida_grams else \
+                2 * len(grams & salida_grams) / (len(grams) + len(salida_grams))
+            if similarity >= threshold and similarity > best_similarity:
+                best, best_similarity = salida_item, similarity
+        if best is not None:
+            cliente_item['matched'] = best['matched'] = True
+            pares.append((cliente_item, best))
+            similitudes.append(best_similarity)
+    return pares, similitudes
+
+
+def _random_fuzzy_items(rng, count):
+    words = ('caja', 'bancos', 'créditos', 'por', 'ventas', 'deudas', 'comerciales', 'fiscales', 'otros', 'bienes', 'de', 'uso')
+    items = []
+    for pos in range(count):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        variant = rng.random()
+        if variant < 0.2:
+            text = text.upper().replace('E', 'É')  # Mismos trigramas una vez normalizado
+        elif variant < 0.4 and len(text) > 3:
+            cut = rng.randrange(len(text))
+            text = text[:cut] + text[cut + 1:]  # Un error de tipeo
+        elif variant < 0.5:
+            text = f"{text}."
+        items.append({'text': text, 'matched': rng.random() < 0.2, 'pos': pos})
+    return items
+
+
+@pytest.mark.parametrize('threshold', [0.5, 0.7, comparador.FUZZY_DEFAULT_THRESHOLD, 1.0])
+def test_fuzzy_matching_matches_all_pairs(comparator, threshold):
+    rng = random.Random(threshold)
+    comparator.fuzzy_threshold = threshold
+    for _ in range(200):
+        data_cliente, data_salida = _random_fuzzy_items(rng, rng.randint(0, 15)), _random_fuzzy_items(rng, rng.randint(0, 15))
+        expected_cliente, expected_salida = copy.deepcopy(data_cliente), copy.deepcopy(data_salida)
+        pares, similitudes = comparator._match_fuzzy(data_cliente, data_salida)
+        expected, expected_similitudes = _all_pairs_fuzzy(expected_cliente, expected_salida, threshold)
+        assert [(c['pos'], s['pos']) for c, s in pares] == [(c['pos'], s['pos']) for c, s in expected]
+        assert similitudes == expected_similitudes
+        assert data_cliente == expected_cliente and data_salida == expected_salida
+
+
+def test_service_limits_paths_and_uploads(libros, tmp_path):
+    outside = tmp_path / 'fuera.xlsx'
+    outside.write_bytes(b'x')
+    link = os.path.join(os.path.dirname(libros[0]), 'enlace.xlsx')
+    os.symlink(outside, link)
+    service = comparador.ComparisonService(workers=1, upload_dir=str(tmp_path / 'subidas'), upload_max_files=2,
+                                           roots=[os.path.dirname(libros[0])])
+    try:
+        job = service.build_job({'cliente': libros[0], 'salida': libros[1], 'year': YEAR, 'month': MONTH})
+        assert (job['cliente'], job['salida']) == libros
+        for path in (str(outside), link):
+            with pytest.raises(ValueError, match='fuera de los directorios permitidos'):
+                service.build_job({'cliente': path, 'salida': libros[1], 'year': YEAR, 'month': MONTH})
+
+        # Tope de 2 subidos: se borra el usado hace más tiempo, nunca el recién guardado
+        first, second = service.store_upload(b'uno'), service.store_upload(b'dos')
+        time.sleep(0.01)
+        service.upload_path(first)
+        third = service.store_upload(b'tres')
+        assert sorted(os.listdir(service.upload_dir)) == sorted([first, third])
+    finally:
+        service.close()
+        os.remove(link)
+
+
+def test_serve_refuses_non_loopback_host():
+    with pytest.raises(ValueError, match='direcciones locales'):
+        comparador.serve(host='0.0.0.0', port=0)
+
+
+def test_service_rejects_negative_content_length(tmp_path):
+    servers = []
+    thread = threading.Thread(target=comparador.serve,
+                              kwargs={'port': 0, 'workers': 1, 'upload_dir': str(tmp_path), 'ready': servers.append},
+                              daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 60
+    while not servers and time.monotonic() < deadline:
+        time.sleep(0.05)
+    server = servers[0]
+    try:
+        with socket.create_connection(server.server_address[:2], timeout=10) as client:
+            client.sendall(b"POST /comparar HTTP/1.1\r\nHost: localhost\r\nContent-Length: -1\r\n\r\n")
+            # Tras un 400 el servidor cierra la conexión: se lee hasta el final
+            response = b''.join(iter(lambda: client.recv(4096), b'')).decode('utf-8')
+        assert response.startswith('HTTP/1.1 400')
+        assert 'Content-Length' in response.split('\r\n\r\n', 1)[1]
+    finally:
+        server.shutdown()
+        thread.join(timeout=30)
+
+
+def test_subtotals_compare_signed_rounded_values(libros):
+    comparator = comparador.ExcelComparator(*libros, YEAR, MONTH, check_subtotals=True)
+    titles = ['1 Activo', '1.1 Caja', '2 Pasivo', '2.1 Deudas', '3 Resultados', '3.1 Ventas']
+    items = [{'row_num': row_num, 'full_title': title} for row_num, title in enumerate(titles, start=10)]
+    parents = np.array([-1, 0, -1, 2, -1, 4])
+    # Signo invertido; 0.5 y 0.8 redondeados (0 y 1); 100.4 y 99.6 son ambos 100
+    actual = [-50.0, 50.0, 0.5, 0.8, 100.4, 99.6]
+    anterior = [np.nan, 10.0, 7.0, 7.0, 3.0, 3.0]
+    messages = []
+    comparator._check_subtotals('Hoja', 'cliente', items, parents, actual, anterior, messages)
+    assert [(finding.row_num, finding.period, finding.cliente_value, finding.children_value)
+            for finding in messages] == [(10, 'Actual', -50, 50), (12, 'Actual', 0, 1)]